@@ -330,7 +330,7 @@ $(document).ready(function() {
 
             for (const step of json) {
                 const players_info = convertToPlayerInfo(step.players, step.scores);
-                gameData.push({"env": step.rep.env, "players":players_info, "active_player": step.active_player.name});
+                gameData.push({"env": repToEnv(step.rep), "players":players_info, "active_player": step.active_player.name});
             }
             steps = gameData;
             index = 0;
@@ -417,10 +417,10 @@ $(document).ready(function() {
         socket.on("play", (...args) => {
             json = JSON.parse(args[0]);
             if (!json.rep) json = JSON.parse(json);
-            if (json.rep && json.rep.env) {
+            if (json.rep && (json.rep.env || json.rep.cells)) {
                 nextPlayer = json.active_player.name;
                 const players_info = convertToPlayerInfo(json.players, json.scores);
-                steps.push({"env": json.rep.env, "players":players_info, "active_player": nextPlayer});
+                steps.push({"env": repToEnv(json.rep), "players":players_info, "active_player": nextPlayer});
                 index = steps.length - 1;
                 drawNewState(steps[index]);
             }
@@ -489,6 +489,21 @@ $(document).ready(function() {
         return playerInfo;
     }
     
+    // Boards sent with the compact encoding are one row-major string ("R", "B" or "." per cell)
+    function repToEnv(rep) {
+        if (rep.env) return rep.env;
+        const env = {};
+        const cols = rep.dim[1];
+        for (let index = 0; index < rep.cells.length; index++) {
+            const pieceType = rep.cells[index];
+            if (pieceType !== ".") {
+                const owners = rep.owners || {};
+                env["(" + Math.floor(index / cols) + ", " + (index % cols) + ")"] = {"piece_type": pieceType, "owner_id": owners[pieceType]};
+            }
+        }
+        return env;
+    }
+
     function drawGrid(rep_env) {
         ctxBoard.clearRect(0, 0, canvasBoard.width, canvasBoard.height);
         ctxBoard.drawImage(boardImg, 0, 0, canvasBoard.width, canvasBoard.height);
@@ -1,203 +1,121 @@
 import heapq
-import time
 from player_hex import PlayerHex
 from seahorse.game.action import Action
 from game_state_hex import GameStateHex
+from geometry_hex import get_geometry
+from move_ordering_hex import MoveOrdering
+from ponder_hex import Ponderer
+from search_hex import PVSearch
+from smp_hex import LazySMP, is_last_move
+from symmetry_hex import get_symmetry_tables
+from time_manager_hex import TimeManager
+from transposition_hex import TranspositionTable
+
+# Taille de la table de transposition (Mo), partagée entre les processus en mode Lazy SMP
+TABLE_MB = 64
 
 class MyPlayer(PlayerHex):
     """
     Version 5: "The Engine"
     - Stratégie : Dijkstra avec Ponts (Bridges) + Iterative Deepening.
-    - Optimisations : Transposition Table (Mémorisation) + Killer Moves (Tri dynamique).
+    - Optimisations : Transposition Table (Mémorisation) + Killer Moves par ply et historique (move_ordering_hex).
+    - Recherche : PVS + fenêtres d'aspiration + LMR (search_hex.PVSearch).
+    - Réflexion pendant le tour adverse (ponder=True) sur la réponse prévue.
     - Objectif : Atteindre les profondeurs 4, 5 ou 6.
     """
 
-    def __init__(self, piece_type: str, name: str = "MyPlayerTurbo"):
+    def __init__(self, piece_type: str, name: str = "MyPlayerTurbo", workers: int = 1, table_mb: float = TABLE_MB,
+                 ponder: bool = False):
         super().__init__(piece_type, name)
         
-        # Définition des ponts (Connexions virtuelles indéfendables)
-        self.bridge_offsets = [
-            ((-1, 2), [(0, 1), (-1, 1)]),
-            ((1, 1),  [(0, 1), (1, 0)]),
-            ((2, -1), [(1, 0), (1, -1)]),
-            ((1, -2), [(0, -1), (1, -1)]),
-            ((-1, -1),[(0, -1), (-1, 0)]),
-            ((-2, 1), [(-1, 0), (-1, 1)])
-        ]
-        
         # Caches et Optimisations
-        self.center_cache = {}
-        self.transposition_table = {} # Stocke les évaluations des plateaux déjà vus
-        self.killer_moves = {}        # depth -> action_str (Stocke les coups qui provoquent des coupures)
+        self.transposition_table = None # Table de taille fixe (créée au premier coup, elle dépend du plateau)
+
+        # Moteur de recherche : PVS + fenêtres d'aspiration + réductions des coups tardifs (LMR)
+        # Le tri des coups (coup de la table, killers, historique puis centre) est créé au premier coup
+        self.search = PVSearch(self.heuristic, self.order_actions, transposition_table=self.transposition_table)
+        # Lazy SMP : workers-1 processus auxiliaires cherchent la même racine (table partagée)
+        self.smp = LazySMP(workers - 1) if workers > 1 else None
+        self.table_mb = table_mb
+        # Pondering : un thread continue la recherche sur la réponse prévue de l'adversaire
+        self.ponderer = Ponderer(self.search) if ponder else None
+        self.last_depth = 0 # Profondeur atteinte par la dernière recherche
+        # Gestion du temps partagée : budget selon le temps restant, les cases vides et l'instabilité
+        self.clock = TimeManager(max_time=12.0)
 
     def compute_action(self, current_state: GameStateHex, remaining_time: float = 15*60, **kwargs) -> Action:
-        """Iterative Deepening avec gestion du temps millimétrée."""
-        if not self.center_cache:
+        """Iterative Deepening (PVS + fenêtres d'aspiration + LMR) avec gestion du temps millimétrée."""
+        if self.transposition_table is None:
             rows, cols = current_state.get_rep().get_dimensions()
-            self._init_center_cache(rows, cols)
+            # Sécurité : un processus démon ne peut pas créer de processus
+            if self.smp is not None and not self.smp.can_fork():
+                self.smp = None
+            # Table préallouée : la mémoire ne grandit plus au fil de la partie
+            self.init_search(rows, cols, TranspositionTable(self.table_mb, cols, shared=self.smp is not None))
 
-        start_time = time.time()
-        
-        # Allocation temps : 5% du temps restant, max 12s, min 1s
-        time_limit = start_time + max(1.0, min(12.0, remaining_time * 0.05)) 
-        
         actions = list(current_state.generate_possible_stateful_actions())
         if not actions:
             return None # Sécurité
-            
-        best_action = actions[0]
-        
-        try:
-            # Iterative Deepening
-            for depth in range(1, 10):
-                if time.time() > time_limit:
-                    break
-                
-                # On lance l'Alpha-Beta
-                val, action = self.alpha_beta(
-                    current_state, depth, float("-inf"), float("inf"), 
-                    True, time_limit, is_root=True
-                )
-                
-                if action:
-                    best_action = action
-                    
-        except TimeoutError:
-            pass # Le temps est écoulé, on retourne le meilleur coup de la profondeur précédente
 
+        # Si l'adversaire a joué la réponse prévue, la réflexion a déjà cherché cette position
+        pondered_action, pondered_depth = (None, 0) if self.ponderer is None else self.ponderer.stop(current_state)
+
+        if self.clock.is_panic(remaining_time):
+            # Plus le temps de chercher : coup de secours immédiat (killer, historique puis centre)
+            best_action = (pondered_action if pondered_action is not None
+                           else self.search.move_ordering.order(actions, 0)[0])
+        elif pondered_action is not None and pondered_depth >= self.last_depth:
+            # Aussi profond qu'une recherche normale : on joue tout de suite
+            best_action = pondered_action
+        else:
+            # Budget du coup : part du temps restant selon les cases vides, prolongée tant que le meilleur coup change
+            time_limit = self.clock.start(remaining_time, current_state.get_rep().get_empty_count())
+            # Le moteur renvoie le meilleur coup de la dernière profondeur complétée
+            # (table, historique et variation principale sont conservés d'un tour à l'autre)
+            if self.smp is not None:
+                # Les processus auxiliaires ne voient pas l'instabilité : ils s'arrêtent à la limite souple
+                best_action, _ = self.smp.search(self, current_state, self.clock.get_deadline())
+                self.last_depth = self.smp.completed_depth
+            else:
+                best_action, _ = self.search.iterative_deepening(current_state, time_limit,
+                                                                 start_depth=pondered_depth + 1, clock=self.clock)
+                self.last_depth = max(self.search.completed_depth, pondered_depth)
+            if best_action is None:
+                best_action = pondered_action if pondered_action is not None else actions[0]
+
+        if self.smp is not None and is_last_move(best_action.get_next_game_state()):
+            # Le processus du joueur est tué en fin de partie sans passer par atexit :
+            # auxiliaires et table partagée sont libérés maintenant (recréés si la partie continue)
+            self.release()
+        elif self.ponderer is not None:
+            self.ponderer.start(current_state, best_action)
         return best_action
 
-    def _init_center_cache(self, rows, cols):
-        """Pré-calcule la distance au centre pour le tri."""
-        cr, cc = rows // 2, cols // 2
-        for r in range(rows):
-            for c in range(cols):
-                self.center_cache[(r, c)] = (r - cr)**2 + (c - cc)**2
+    def release(self) -> None:
+        """Arrête les processus auxiliaires et détruit la table de transposition partagée."""
+        if self.smp is not None:
+            self.smp.close()
+        if self.transposition_table is not None:
+            self.transposition_table.close()
+            self.transposition_table = None
 
-    def _get_board_hash(self, state: GameStateHex) -> tuple:
+    def init_search(self, rows: int, cols: int, transposition_table: TranspositionTable) -> None:
         """
-        Crée une signature unique (hash) de l'état du plateau.
-        Extrêmement rapide et permet de reconnaître si on a déjà évalué cette position.
+        Prépare la recherche pour un plateau : tri des coups centré et table de transposition.
+        Appelée au premier coup, et par les processus auxiliaires du Lazy SMP avec la table partagée.
         """
-        env = state.get_rep().get_env()
-        # On crée un tuple trié des pièces présentes: ((r, c), 'R'), ...
-        # (L'utilisation d'un tuple le rend hashable pour le dictionnaire)
-        board_state = tuple(sorted((k, v.get_type()) for k, v in env.items()))
-        return board_state
-
-    def alpha_beta(self, state: GameStateHex, depth: int, alpha: float, beta: float, 
-                   maximizing_player: bool, time_limit: float, is_root: bool = False) -> tuple[float, Action]:
-        
-        if time.time() > time_limit:
-            raise TimeoutError()
-
-        # --- 1. TRANSPOSITION TABLE (Lecture) ---
-        board_hash = self._get_board_hash(state)
-        if board_hash in self.transposition_table:
-            tt_depth, tt_score, tt_flag, tt_action = self.transposition_table[board_hash]
-            
-            # Si on a déjà cherché ce plateau à une profondeur égale ou supérieure
-            if tt_depth >= depth:
-                if tt_flag == 'EXACT':
-                    return tt_score, tt_action
-                elif tt_flag == 'LOWERBOUND':
-                    alpha = max(alpha, tt_score)
-                elif tt_flag == 'UPPERBOUND':
-                    beta = min(beta, tt_score)
-                    
-                if alpha >= beta:
-                    return tt_score, tt_action
-
-        # --- 2. CONDITIONS D'ARRÊT ---
-        if depth == 0 or state.is_done():
-            score = self.heuristic(state)
-            # On sauvegarde dans la TT
-            self.transposition_table[board_hash] = (depth, score, 'EXACT', None)
-            return score, None
-
-        actions = list(state.generate_possible_stateful_actions())
-        if not actions:
-             return self.heuristic(state), None
-
-        # --- 3. MOVE ORDERING (Tri des coups) ---
-        # Récupération du Killer Move pour cette profondeur
-        killer_move_str = self.killer_moves.get(depth, None)
-        curr_env = state.get_rep().get_env()
-
-        def score_action(action):
-            # Identifier la case jouée par cette action
-            next_env = action.get_next_game_state().get_rep().get_env()
-            move_coord = None
-            for k in next_env:
-                if k not in curr_env:
-                    move_coord = k
-                    break
-            
-            score = 0
-            if move_coord:
-                # 1. Priorité absolue au Killer Move
-                if str(move_coord) == killer_move_str:
-                    score += 10000 
-                # 2. Priorité secondaire au centre
-                score -= self.center_cache.get(move_coord, 100)
-            return score
-            
-        actions.sort(key=score_action, reverse=True)
-
-        # --- 4. EXPLORATION DE L'ARBRE ---
-        best_action = actions[0]
-        original_alpha = alpha
-
-        if maximizing_player:
-            max_eval = float("-inf")
-            for action in actions:
-                next_state = action.get_next_game_state()
-                eval_val, _ = self.alpha_beta(next_state, depth - 1, alpha, beta, False, time_limit, False)
-                
-                if eval_val > max_eval:
-                    max_eval = eval_val
-                    best_action = action
-                
-                alpha = max(alpha, eval_val)
-                if beta <= alpha:
-                    # KILLER MOVE REPERÉ ! On le stocke pour les branches parallèles
-                    next_env = action.get_next_game_state().get_rep().get_env()
-                    for k in next_env:
-                        if k not in curr_env:
-                            self.killer_moves[depth] = str(k)
-                            break
-                    break # Cut-off
-                    
-        else:
-            max_eval = float("inf") # En fait c'est min_eval ici, gardons max_eval par simplicité de nom de variable retournée
-            for action in actions:
-                next_state = action.get_next_game_state()
-                eval_val, _ = self.alpha_beta(next_state, depth - 1, alpha, beta, True, time_limit, False)
-                
-                if eval_val < max_eval:
-                    max_eval = eval_val
-                    best_action = action
-                    
-                beta = min(beta, eval_val)
-                if beta <= alpha:
-                    # KILLER MOVE REPERÉ !
-                    next_env = action.get_next_game_state().get_rep().get_env()
-                    for k in next_env:
-                        if k not in curr_env:
-                            self.killer_moves[depth] = str(k)
-                            break
-                    break # Cut-off
-
-        # --- 5. TRANSPOSITION TABLE (Écriture) ---
-        tt_flag = 'EXACT'
-        if max_eval <= original_alpha:
-            tt_flag = 'UPPERBOUND'
-        elif max_eval >= beta:
-            tt_flag = 'LOWERBOUND'
-            
-        self.transposition_table[board_hash] = (depth, max_eval, tt_flag, best_action)
-
-        return max_eval, best_action
+        self.search.move_ordering = MoveOrdering.centred(rows, cols)
+        self.transposition_table = transposition_table
+        self.search.transposition_table = transposition_table
+
+    def order_actions(self, state: GameStateHex, actions: list, depth: int, ply: int) -> list:
+        """A la racine, on retire les coups symétriques. Le tri lui-même est fait par search.move_ordering."""
+        # A la racine, un coup et son symétrique sur un plateau symétrique se valent
+        if ply == 0:
+            rows, cols = state.get_rep().get_dimensions()
+            unique = set(get_symmetry_tables(rows, cols).get_unique_moves(state.get_rep().get_cells()))
+            actions = [a for a in actions if a.get_move()[0][0] * cols + a.get_move()[0][1] in unique]
+        return actions
 
     def heuristic(self, state: GameStateHex) -> float:
         """
@@ -224,73 +142,53 @@ class MyPlayer(PlayerHex):
     def _get_shortest_path_distance(self, state, piece_type):
         """
         Dijkstra A* simplifié + Ponts + TEMPLATES DE BORD.
+        Voisins et ponts viennent des tables précalculées de geometry_hex (indices i*cols+j).
         """
         board = state.get_rep()
-        env = board.get_env()
         rows, cols = board.get_dimensions()
+        geo = get_geometry(rows, cols)
+        cells = board.get_cells()
+        neighbours, bridges = geo.neighbours, geo.bridges
+        opp_piece = "B" if piece_type == "R" else "R"
         pq, dist_map = [], {}
 
-        if piece_type == "R":
-            start_row, target_row = 0, rows - 1
-            for j in range(cols):
-                p = env.get((start_row, j))
-                d = 1 if p is None else (0 if p.get_type() == "R" else None)
-                if d is not None: dist_map[(start_row, j)] = d; heapq.heappush(pq, (d, start_row, j))
-        else:
-            start_col, target_col = 0, cols - 1
-            for i in range(rows):
-                p = env.get((i, start_col))
-                d = 1 if p is None else (0 if p.get_type() == "B" else None)
-                if d is not None: dist_map[(i, start_col)] = d; heapq.heappush(pq, (d, i, start_col))
+        for u in (geo.top if piece_type == "R" else geo.left):
+            p = cells[u]
+            d = 1 if p is None else (0 if p == piece_type else None)
+            if d is not None: dist_map[u] = d; heapq.heappush(pq, (d, u))
 
         while pq:
-            d, r, c = heapq.heappop(pq)
-            if d > dist_map.get((r, c), float("inf")): continue
+            d, u = heapq.heappop(pq)
+            if d > dist_map.get(u, float("inf")): continue
 
+            r, c = divmod(u, cols)
+            # Template de bord : les deux cases vers le bord d'arrivée ne sont pas adverses
             if piece_type == "R":
-                if r == target_row: return d
-                if r == rows - 2:
-                    c1, c2 = env.get((r+1, c)), env.get((r+1, c-1))
-                    valid_c1 = (c1 is None or c1.get_type() == "R")
-                    valid_c2 = (c2 is None or c2.get_type() == "R")
-                    if (0 <= c < cols and valid_c1) and (0 <= c-1 < cols and valid_c2):
-                        return d
+                if r == rows - 1: return d
+                if r == rows - 2 and c >= 1 and cells[u + cols] != opp_piece and cells[u + cols - 1] != opp_piece:
+                    return d
             else:
-                if c == target_col: return d
-                if c == cols - 2:
-                    c1, c2 = env.get((r, c+1)), env.get((r-1, c+1))
-                    valid_c1 = (c1 is None or c1.get_type() == "B")
-                    valid_c2 = (c2 is None or c2.get_type() == "B")
-                    if (0 <= r < rows and valid_c1) and (0 <= r-1 < rows and valid_c2):
-                        return d
-
-            for _, (_, (nr, nc)) in board.get_neighbours(r, c).items():
-                if 0 <= nr < rows and 0 <= nc < cols:
-                    np = env.get((nr, nc))
-                    if np is None: weight = 1
-                    elif np.get_type() == piece_type: weight = 0
-                    else: continue
-                    
-                    if d + weight < dist_map.get((nr, nc), float("inf")):
-                        dist_map[(nr, nc)] = d + weight
-                        heapq.heappush(pq, (d + weight, nr, nc))
-            
-            for (dr, dc), shared in self.bridge_offsets:
-                nr, nc = r + dr, c + dc
-                if 0 <= nr < rows and 0 <= nc < cols:
-                    dest_p = env.get((nr, nc))
-                    if dest_p is not None and dest_p.get_type() != piece_type: continue
-
-                    safe = True
-                    for (ir, ic) in shared:
-                        mr, mc = r+ir, c+ic
-                        if not (0 <= mr < rows and 0 <= mc < cols) or env.get((mr, mc)) is not None:
-                            safe = False; break
-                    
-                    if safe:
-                        weight = 0 if (dest_p is not None and dest_p.get_type() == piece_type) else 1
-                        if d + weight < dist_map.get((nr, nc), float("inf")):
-                            dist_map[(nr, nc)] = d + weight
-                            heapq.heappush(pq, (d + weight, nr, nc))
-                            
-        return 999
\ No newline at end of file
+                if c == cols - 1: return d
+                if c == cols - 2 and r >= 1 and cells[u + 1] != opp_piece and cells[u - cols + 1] != opp_piece:
+                    return d
+
+            for v in neighbours[u]:
+                np = cells[v]
+                if np is None: weight = 1
+                elif np == piece_type: weight = 0
+                else: continue
+
+                if d + weight < dist_map.get(v, float("inf")):
+                    dist_map[v] = d + weight
+                    heapq.heappush(pq, (d + weight, v))
+
+            # Pont : destination non adverse, les deux cases porteuses vides
+            for v, s1, s2 in bridges[u]:
+                dest_p = cells[v]
+                if dest_p == opp_piece or cells[s1] is not None or cells[s2] is not None: continue
+                weight = 0 if dest_p == piece_type else 1
+                if d + weight < dist_map.get(v, float("inf")):
+                    dist_map[v] = d + weight
+                    heapq.heappush(pq, (d + weight, v))
+
+        return 999
@@ -1,18 +1,25 @@
 import heapq
-import time
 from player_hex import PlayerHex
 from seahorse.game.action import Action
 from game_state_hex import GameStateHex
+from search_hex import PVSearch
+from smp_hex import LazySMP, is_last_move
+from time_manager_hex import TimeManager
+from transposition_hex import TranspositionTable
+
+# Taille de la table de transposition partagée en mode Lazy SMP (Mo)
+SMP_TABLE_MB = 64
 
 class MyPlayer(PlayerHex):
     """
     Version 4: "Speed & Depth"
     - Stratégie : Dijkstra avec Ponts (Bridges) + Iterative Deepening.
     - Nettoyage : Suppression des heuristiques lentes (Panic, Blocking).
+    - Recherche : PVS + fenêtres d'aspiration + LMR (search_hex.PVSearch).
     - Objectif : Atteindre une profondeur 3 ou 4 constante.
     """
 
-    def __init__(self, piece_type: str, name: str = "MyPlayerTurbo"):
+    def __init__(self, piece_type: str, name: str = "MyPlayerTurbo", workers: int = 1):
         super().__init__(piece_type, name)
         # Définition des ponts (Connexions virtuelles indéfendables)
         self.bridge_offsets = [
@@ -25,42 +32,67 @@ class MyPlayer(PlayerHex):
         ]
         # Cache pour le tri des coups (Move Ordering) uniquement
         self.center_cache = {}
+        # Moteur de recherche : PVS + fenêtres d'aspiration + réductions des coups tardifs (LMR)
+        self.search = PVSearch(self.heuristic, self.order_actions)
+        # Lazy SMP : workers-1 processus auxiliaires cherchent la même racine,
+        # seule une table de transposition partagée les relie
+        self.smp = LazySMP(workers - 1) if workers > 1 else None
+        # Gestion du temps partagée (temps restant, cases vides, instabilité du meilleur coup)
+        self.clock = TimeManager(max_time=10.0)
 
     def compute_action(self, current_state: GameStateHex, remaining_time: float = 15*60, **kwargs) -> Action:
         """
         Iterative Deepening : Explore profondeur 1, puis 2, puis 3...
         S'arrête dès que le temps alloué au coup est écoulé.
+        Chaque profondeur est une PVS avec fenêtre d'aspiration et LMR (search_hex.PVSearch).
         """
         # Initialisation du cache au premier tour
         if not self.center_cache:
             rows, cols = current_state.get_rep().get_dimensions()
-            self._init_center_cache(rows, cols)
+            # Sécurité : un processus démon ne peut pas créer de processus
+            if self.smp is not None and not self.smp.can_fork():
+                self.smp = None
+            self.init_search(rows, cols, TranspositionTable(SMP_TABLE_MB, cols, shared=True)
+                             if self.smp is not None else None)
 
-        start_time = time.time()
-        # Allocation temps : 5% du temps restant ou 10s max (sécurité)
-        time_limit = start_time + min(10, remaining_time * 0.05) 
-        
         # Fallback : coup par défaut si pas de temps
         best_action = list(current_state.generate_possible_stateful_actions())[0]
-        
-        try:
-            # On tente d'aller le plus profond possible (1 -> 10)
-            for depth in range(1, 10):
-                if time.time() > time_limit:
-                    break
-                
-                val, action = self.alpha_beta(
-                    current_state, depth, float("-inf"), float("inf"), 
-                    True, time_limit, is_root=True
-                )
-                if action:
-                    best_action = action
-                    
-        except TimeoutError:
-            pass # On retourne le meilleur résultat de la profondeur complétée précédente
-
+        if not self.clock.is_panic(remaining_time):
+            # Part du temps restant selon les cases vides, prolongée tant que le meilleur coup change
+            time_limit = self.clock.start(remaining_time, current_state.get_rep().get_empty_count())
+
+            # On tente d'aller le plus profond possible (1 -> 9), le moteur renvoie
+            # le meilleur résultat de la profondeur complétée précédente
+            if self.smp is not None:
+                # Les processus auxiliaires ne voient pas l'instabilité : ils s'arrêtent à la limite souple
+                action, _ = self.smp.search(self, current_state, self.clock.get_deadline())
+            else:
+                action, _ = self.search.iterative_deepening(current_state, time_limit, clock=self.clock)
+            if action:
+                best_action = action
+
+        if self.smp is not None and is_last_move(best_action.get_next_game_state()):
+            # Le processus du joueur est tué en fin de partie sans passer par atexit :
+            # auxiliaires et table partagée sont libérés maintenant (recréés si la partie continue)
+            self.release()
         return best_action
 
+    def release(self) -> None:
+        """Arrête les processus auxiliaires et détruit la table de transposition partagée."""
+        self.smp.close()
+        self.search.transposition_table.close()
+        self.center_cache = {}
+
+    def init_search(self, rows: int, cols: int, transposition_table: TranspositionTable | None = None) -> None:
+        """
+        Prépare la recherche pour un plateau : cache des distances au centre et,
+        en mode Lazy SMP, table de transposition partagée.
+        Appelée au premier coup, et par les processus auxiliaires avec la table partagée.
+        """
+        self._init_center_cache(rows, cols)
+        if transposition_table is not None:
+            self.search.transposition_table = transposition_table
+
     def _init_center_cache(self, rows, cols):
         """Pré-calcule la distance au centre pour le tri rapide des coups."""
         cr, cc = rows // 2, cols // 2
@@ -69,64 +101,19 @@ class MyPlayer(PlayerHex):
                 # Distance euclidienne carrée (plus rapide que racine)
                 self.center_cache[(r, c)] = (r - cr)**2 + (c - cc)**2
 
-    def alpha_beta(self, state: GameStateHex, depth: int, alpha: float, beta: float, 
-                   maximizing_player: bool, time_limit: float, is_root: bool = False) -> tuple[float, Action]:
-        
-        # Vérification stricte du temps
-        if time.time() > time_limit:
-            raise TimeoutError()
-
-        if depth == 0 or state.is_done():
-            return self.heuristic(state), None
-
-        actions = list(state.generate_possible_stateful_actions())
-        if not actions:
-             return self.heuristic(state), None
-
-        # --- MOVE ORDERING (Tri des coups) ---
-        # On trie les coups uniquement à la racine pour booster l'élagage Alpha-Beta.
-        # On privilégie les coups centraux, statistiquement meilleurs.
-        if is_root:
-            curr_env = state.get_rep().get_env()
-            def score_action(action):
-                # Estimation rapide de la position jouée (diff des envs)
-                # Note: Dans une version C++, on passerait le move en paramètre.
-                next_env = action.get_next_game_state().get_rep().get_env()
-                for k in next_env:
-                    if k not in curr_env:
-                        # Plus la distance au centre est petite, meilleur est le score
-                        dist = self.center_cache.get(k, 100)
-                        return -dist # On veut trier par distance croissante (score décroissant)
-                return -1000
-            
-            actions.sort(key=score_action, reverse=True)
-
-        best_action = actions[0]
-
-        if maximizing_player:
-            max_eval = float("-inf")
-            for action in actions:
-                next_state = action.get_next_game_state()
-                eval_val, _ = self.alpha_beta(next_state, depth - 1, alpha, beta, False, time_limit, False)
-                
-                if eval_val > max_eval:
-                    max_eval = eval_val
-                    best_action = action
-                alpha = max(alpha, eval_val)
-                if beta <= alpha: break
-            return max_eval, best_action
-        else:
-            min_eval = float("inf")
-            for action in actions:
-                next_state = action.get_next_game_state()
-                eval_val, _ = self.alpha_beta(next_state, depth - 1, alpha, beta, True, time_limit, False)
-                
-                if eval_val < min_eval:
-                    min_eval = eval_val
-                    best_action = action
-                beta = min(beta, eval_val)
-                if beta <= alpha: break
-            return min_eval, best_action
+    def order_actions(self, state: GameStateHex, actions: list, depth: int, ply: int) -> list:
+        """
+        MOVE ORDERING (Tri des coups) : on privilégie les coups centraux, statistiquement meilleurs.
+        Le tri est fait à tous les niveaux : les réductions (LMR) visent les derniers coups de la liste.
+        """
+        def score_action(action):
+            # La position jouée est portée par l'action, sans construire l'état suivant
+            position, _ = action.get_move()
+            # Plus la distance au centre est petite, meilleur est le score
+            return -self.center_cache.get(position, 100) # On veut trier par distance croissante (score décroissant)
+
+        actions.sort(key=score_action, reverse=True)
+        return actions
 
     def heuristic(self, state: GameStateHex) -> float:
         """
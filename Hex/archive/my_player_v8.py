@@ -1,8 +1,8 @@
 import heapq
-import time
 from player_hex import PlayerHex
 from seahorse.game.action import Action
 from game_state_hex import GameStateHex
+from time_manager_hex import TimeManager, Watchdog
 
 class MyPlayer(PlayerHex):
     """
@@ -25,15 +25,21 @@ class MyPlayer(PlayerHex):
         ]
         # Pré-calcul des poids pour le centre (Move Ordering rapide)
         self.center_weights = {}
+        # Gestion du temps partagée (temps restant, cases vides, instabilité du meilleur coup)
+        self.clock = TimeManager(max_time=10.0)
+        # Drapeau levé par un minuteur à l'échéance : la recherche lit un attribut au lieu de l'horloge
+        self.watchdog = Watchdog()
 
     def compute_action(self, current_state: GameStateHex, remaining_time: float = 15*60, **kwargs) -> Action:
         """
         Utilise l'Iterative Deepening pour aller le plus profond possible
         sans dépasser le temps.
         """
-        start_time = time.time()
-        # On garde 1 seconde de marge de sécurité ou 5% du temps restant
-        time_limit = start_time + min(10, remaining_time * 0.05) 
+        # Plus le temps de chercher : premier coup légal, sans recherche
+        if self.clock.is_panic(remaining_time):
+            return next(iter(current_state.generate_possible_stateful_actions()))
+        # Part du temps restant selon les cases vides, prolongée tant que le meilleur coup change
+        self.clock.start(remaining_time, current_state.get_rep().get_empty_count())
         
         # Initialisation des poids du centre si pas encore fait (taille du plateau connue ici)
         if not self.center_weights:
@@ -44,21 +50,22 @@ class MyPlayer(PlayerHex):
         
         # Profondeur 1 (Rapide) -> Profondeur X
         # On essaie d'aller jusqu'à profondeur 10, mais le temps nous arrêtera avant
-        try:
-            for depth in range(1, 10):
-                # Vérif temps avant de lancer une nouvelle profondeur
-                if time.time() > time_limit:
-                    break
-                
-                score, action = self.alpha_beta(
-                    current_state, depth, float("-inf"), float("inf"), 
-                    True, time_limit
-                )
-                if action:
-                    best_action = action
-                    
-        except TimeoutError:
-            pass # On retourne la meilleure action trouvée à la profondeur précédente
+        for depth in range(1, 10):
+            # Vérif temps avant de lancer une nouvelle profondeur
+            if not self.clock.should_deepen():
+                break
+            self.watchdog.arm(self.clock.get_deadline())
+
+            score, action = self.alpha_beta(
+                current_state, depth, float("-inf"), float("inf"), True
+            )
+            # Profondeur interrompue : on garde la meilleure action de la profondeur précédente
+            if self.watchdog.expired:
+                break
+            if action:
+                best_action = action
+                self.clock.record_iteration(action.get_move()[0])
+        self.watchdog.cancel()
 
         # Fallback si rien trouvé (très rare)
         if best_action is None:
@@ -76,11 +83,12 @@ class MyPlayer(PlayerHex):
                 self.center_weights[(r, c)] = 20 - dist
 
     def alpha_beta(self, state: GameStateHex, depth: int, alpha: float, beta: float, 
-                   maximizing_player: bool, time_limit: float) -> tuple[float, Action]:
+                   maximizing_player: bool) -> tuple[float, Action]:
         
-        # Vérification du temps (toutes les 100 vérifs ou à chaque nœud si nécessaire)
-        if time.time() > time_limit:
-            raise TimeoutError()
+        # Vérification du temps à chaque nœud : simple lecture du drapeau du Watchdog
+        # (le résultat d'un nœud interrompu est ignoré par compute_action)
+        if self.watchdog.expired:
+            return 0.0, None
 
         if depth == 0 or state.is_done():
             return self.heuristic(state), None
@@ -118,25 +126,25 @@ class MyPlayer(PlayerHex):
             max_eval = float("-inf")
             for action in actions:
                 next_state = action.get_next_game_state()
-                eval_val, _ = self.alpha_beta(next_state, depth - 1, alpha, beta, False, time_limit)
+                eval_val, _ = self.alpha_beta(next_state, depth - 1, alpha, beta, False)
                 
                 if eval_val > max_eval:
                     max_eval = eval_val
                     best_action = action
                 alpha = max(alpha, eval_val)
-                if beta <= alpha: break
+                if beta <= alpha or self.watchdog.expired: break
             return max_eval, best_action
         else:
             min_eval = float("inf")
             for action in actions:
                 next_state = action.get_next_game_state()
-                eval_val, _ = self.alpha_beta(next_state, depth - 1, alpha, beta, True, time_limit)
+                eval_val, _ = self.alpha_beta(next_state, depth - 1, alpha, beta, True)
                 
                 if eval_val < min_eval:
                     min_eval = eval_val
                     best_action = action
                 beta = min(beta, eval_val)
-                if beta <= alpha: break
+                if beta <= alpha or self.watchdog.expired: break
             return min_eval, best_action
 
     def heuristic(self, state: GameStateHex) -> float:
@@ -1,8 +1,8 @@
 import heapq
-import time
 from player_hex import PlayerHex
 from seahorse.game.action import Action
 from game_state_hex import GameStateHex
+from time_manager_hex import TimeManager, Watchdog
 
 class MyPlayer(PlayerHex):
     """
@@ -25,6 +25,10 @@ class MyPlayer(PlayerHex):
         ]
         # Cache pour le tri des coups (Move Ordering) uniquement
         self.center_cache = {}
+        # Gestion du temps partagée (temps restant, cases vides, instabilité du meilleur coup)
+        self.clock = TimeManager(max_time=10.0)
+        # Drapeau levé par un minuteur à l'échéance : la recherche lit un attribut au lieu de l'horloge
+        self.watchdog = Watchdog()
 
     def compute_action(self, current_state: GameStateHex, remaining_time: float = 15*60, **kwargs) -> Action:
         """
@@ -36,28 +40,30 @@ class MyPlayer(PlayerHex):
             rows, cols = current_state.get_rep().get_dimensions()
             self._init_center_cache(rows, cols)
 
-        start_time = time.time()
-        # Allocation temps : 5% du temps restant ou 10s max (sécurité)
-        time_limit = start_time + min(10, remaining_time * 0.05) 
-        
         # Fallback : coup par défaut si pas de temps
         best_action = list(current_state.generate_possible_stateful_actions())[0]
+        if self.clock.is_panic(remaining_time):
+            return best_action
+
+        # Part du temps restant selon les cases vides, prolongée tant que le meilleur coup change
+        self.clock.start(remaining_time, current_state.get_rep().get_empty_count())
         
-        try:
-            # On tente d'aller le plus profond possible (1 -> 10)
-            for depth in range(1, 10):
-                if time.time() > time_limit:
-                    break
-                
-                val, action = self.alpha_beta(
-                    current_state, depth, float("-inf"), float("inf"), 
-                    True, time_limit, is_root=True
-                )
-                if action:
-                    best_action = action
-                    
-        except TimeoutError:
-            pass # On retourne le meilleur résultat de la profondeur complétée précédente
+        # On tente d'aller le plus profond possible (1 -> 10)
+        for depth in range(1, 10):
+            if not self.clock.should_deepen():
+                break
+            self.watchdog.arm(self.clock.get_deadline())
+
+            val, action = self.alpha_beta(
+                current_state, depth, float("-inf"), float("inf"), True, is_root=True
+            )
+            # Profondeur interrompue : on garde le meilleur résultat de la profondeur complétée précédente
+            if self.watchdog.expired:
+                break
+            if action:
+                best_action = action
+                self.clock.record_iteration(action.get_move()[0])
+        self.watchdog.cancel()
 
         return best_action
 
@@ -70,11 +76,12 @@ class MyPlayer(PlayerHex):
                 self.center_cache[(r, c)] = (r - cr)**2 + (c - cc)**2
 
     def alpha_beta(self, state: GameStateHex, depth: int, alpha: float, beta: float, 
-                   maximizing_player: bool, time_limit: float, is_root: bool = False) -> tuple[float, Action]:
+                   maximizing_player: bool, is_root: bool = False) -> tuple[float, Action]:
         
-        # Vérification stricte du temps
-        if time.time() > time_limit:
-            raise TimeoutError()
+        # Vérification du temps à chaque nœud : simple lecture du drapeau du Watchdog
+        # (le résultat d'un nœud interrompu est ignoré par compute_action)
+        if self.watchdog.expired:
+            return 0.0, None
 
         if depth == 0 or state.is_done():
             return self.heuristic(state), None
@@ -107,25 +114,25 @@ class MyPlayer(PlayerHex):
             max_eval = float("-inf")
             for action in actions:
                 next_state = action.get_next_game_state()
-                eval_val, _ = self.alpha_beta(next_state, depth - 1, alpha, beta, False, time_limit, False)
+                eval_val, _ = self.alpha_beta(next_state, depth - 1, alpha, beta, False, False)
                 
                 if eval_val > max_eval:
                     max_eval = eval_val
                     best_action = action
                 alpha = max(alpha, eval_val)
-                if beta <= alpha: break
+                if beta <= alpha or self.watchdog.expired: break
             return max_eval, best_action
         else:
             min_eval = float("inf")
             for action in actions:
                 next_state = action.get_next_game_state()
-                eval_val, _ = self.alpha_beta(next_state, depth - 1, alpha, beta, True, time_limit, False)
+                eval_val, _ = self.alpha_beta(next_state, depth - 1, alpha, beta, True, False)
                 
                 if eval_val < min_eval:
                     min_eval = eval_val
                     best_action = action
                 beta = min(beta, eval_val)
-                if beta <= alpha: break
+                if beta <= alpha or self.watchdog.expired: break
             return min_eval, best_action
 
     def heuristic(self, state: GameStateHex) -> float:
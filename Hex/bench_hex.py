@@ -0,0 +1,436 @@
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from seahorse.game.game_layout.board import Piece
+
+from board_hex import BoardHex
+from game_state_hex import GameStateHex
+from heuristics.h1_dijkstra import get_shortest_path_distance
+from mcts_hex import MCTS
+from move_ordering_hex import MoveOrdering
+from player_hex import PlayerHex
+from playout_hex import BatchPlayout, FillPlayout
+from search_hex import INFINITY, PVSearch
+from search_state_hex import SearchStateHex
+from transposition_hex import ALWAYS_SLOT, DEPTH_SLOT, ENTRY_BYTES, FLAGS, GENERATIONS, NO_MOVE, TranspositionTable
+from union_find_hex import HexUnionFind
+
+# Bytes a search tree may keep alive per node, state and action included.
+# Depth 2 on 14x14 at 40 stones measures about 670 bytes per node.
+NODE_BYTES_BUDGET = 700
+
+
+def make_state(dim: int, stones: int, seed: int) -> GameStateHex:
+    """
+    Builds a reproducible mid-game position with alternating random stones.
+
+    Args:
+        dim (int): size of the board
+        stones (int): number of stones already played
+        seed (int): seed of the random generator
+
+    Returns:
+        GameStateHex: the position, red to play if stones is even
+    """
+    players = [PlayerHex("R", name="red"), PlayerHex("B", name="blue")]
+    rng = random.Random(seed)
+    cells = [(i, j) for i in range(dim) for j in range(dim)]
+    rng.shuffle(cells)
+    env = {}
+    for k, position in enumerate(cells[:stones]):
+        player = players[k % 2]
+        env[position] = Piece(piece_type=player.get_piece_type(), owner=player)
+    rep = BoardHex(env=env, dim=[dim, dim])
+    return GameStateHex({p.get_id(): 0 for p in players}, players[stones % 2], players, rep, step=stones)
+
+
+def bench_expand(state: GameStateHex, depth: int) -> int:
+    """
+    Expands every child of a state down to a fixed depth.
+
+    Returns:
+        int: number of nodes created
+    """
+    if depth == 0 or state.is_done():
+        return 1
+    nodes = 1
+    for action in state.generate_possible_stateful_actions():
+        nodes += bench_expand(action.get_next_game_state(), depth - 1)
+    return nodes
+
+
+def bench_make_unmake(search: SearchStateHex, depth: int) -> int:
+    """
+    Same expansion as bench_expand, with in-place make/unmake moves.
+
+    Returns:
+        int: number of nodes visited
+    """
+    if depth == 0 or search.winner() is not None:
+        return 1
+    nodes = 1
+    for index in search.get_empty_indices():
+        search.play(index)
+        nodes += bench_make_unmake(search, depth - 1)
+        search.undo()
+    return nodes
+
+
+def grow_tree(state: GameStateHex, depth: int, nodes: list) -> None:
+    """
+    Expands a state like bench_expand, keeping every action and state alive.
+    """
+    nodes.append(state)
+    if depth == 0 or state.is_done():
+        return
+    for action in state.generate_possible_stateful_actions():
+        nodes.append(action)
+        grow_tree(action.get_next_game_state(), depth - 1, nodes)
+
+
+def run_board(args) -> None:
+    state = make_state(args.dim, args.stones, args.seed)
+    start = time.perf_counter()
+    nodes = bench_expand(state, args.depth)
+    elapsed = time.perf_counter() - start
+    print(f"{'BoardHex':<12} {nodes:>8} nodes  {elapsed:7.3f}s  {nodes / elapsed:10.0f} nodes/s")
+
+
+def run_search(args) -> None:
+    state = make_state(args.dim, args.stones, args.seed)
+    for name, expand, root in (("GameStateHex", bench_expand, state),
+                               ("SearchStateHex", bench_make_unmake, SearchStateHex.from_game_state(state))):
+        start = time.perf_counter()
+        nodes = expand(root, args.depth)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<14} {nodes:>8} nodes  {elapsed:7.3f}s  {nodes / elapsed:10.0f} nodes/s")
+
+
+def run_memory(args) -> None:
+    state = make_state(args.dim, args.stones, args.seed)
+    state.get_groups()
+    state.get_zobrist()
+    gc.collect()
+    tracemalloc.start()
+    nodes = []
+    grow_tree(state, args.depth, nodes)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    states = sum(isinstance(node, GameStateHex) for node in nodes)
+    per_node = allocated / states
+    verdict = "within" if per_node <= NODE_BYTES_BUDGET else "OVER"
+    print(f"{states} states  {allocated / 2**20:7.2f} MiB  {per_node:6.0f} bytes/node  "
+          f"({verdict} the {NODE_BYTES_BUDGET} bytes budget)")
+
+
+def run_playout(args) -> None:
+    state = SearchStateHex.from_game_state(make_state(args.dim, args.stones, args.seed))
+    engine = FillPlayout(args.dim, args.dim, args.seed)
+    red, blue = state.masks["R"], state.masks["B"]
+    start = time.perf_counter()
+    red_wins = sum(engine.run(red, blue, state.to_move)[0] == "R" for _ in range(args.count))
+    elapsed = time.perf_counter() - start
+    print(f"FillPlayout  {args.count:>8} playouts  {elapsed:7.3f}s  {args.count / elapsed:10.0f} playouts/s  "
+          f"red wins {red_wins / args.count:.1%}")
+    batch = BatchPlayout(args.dim, args.dim, args.seed)
+    start = time.perf_counter()
+    red_wins = 0
+    for first in range(0, args.count, args.batch):
+        red_wins += int(batch.run(red, blue, state.to_move, min(args.batch, args.count - first))[0].sum())
+    elapsed = time.perf_counter() - start
+    print(f"BatchPlayout {args.count:>8} playouts  {elapsed:7.3f}s  {args.count / elapsed:10.0f} playouts/s  "
+          f"red wins {red_wins / args.count:.1%}")
+
+
+def play_match(engines: dict[str, MCTS], dim: int, budget: float, by_time: bool,
+               totals: dict[str, list[float]]) -> str:
+    """
+    Plays one game between two search engines from the empty board.
+
+    Args:
+        engines (dict[str, MCTS]): engine of each piece type
+        dim (int): size of the board
+        budget (float): playouts per move, or seconds per move if by_time
+        by_time (bool): whether the engines get a time budget instead of a playout count
+        totals (dict[str, list[float]]): playouts and seconds of each piece type, updated in place
+
+    Returns:
+        str: piece type of the winner
+    """
+    state = SearchStateHex(dim, dim)
+    while state.winner() is None:
+        engine = engines[state.to_move]
+        if by_time:
+            root = engine.search(state, budget)
+        else:
+            root = engine.search(state, float("inf"), int(budget))
+        totals[state.to_move][0] += engine.playouts
+        totals[state.to_move][1] += engine.elapsed
+        state.play(root.get_best_child().move)
+    return state.winner()
+
+
+def run_rave(args) -> None:
+    for by_time, budget in ((False, args.playouts), (True, args.time)):
+        wins = 0
+        rates = {"RAVE": [0, 0.0], "UCT": [0, 0.0]}
+        for game in range(args.games):
+            rave_colour, uct_colour = ("R", "B") if game % 2 == 0 else ("B", "R")
+            engines = {rave_colour: MCTS(0.0, args.seed + game, rave_equivalence=args.equivalence),
+                       uct_colour: MCTS(args.exploration, args.seed + args.games + game)}
+            totals = {rave_colour: rates["RAVE"], uct_colour: rates["UCT"]}
+            wins += play_match(engines, args.dim, budget, by_time, totals) == rave_colour
+        condition = f"{budget:g}s per move" if by_time else f"{budget:g} playouts per move"
+        speeds = "  ".join(f"{name} {count / seconds:6.0f} playouts/s" for name, (count, seconds) in rates.items())
+        print(f"{condition:<22} RAVE wins {wins:>3}/{args.games}  {speeds}")
+
+
+def search_fixed_depth(state: GameStateHex, depth: int, killers_and_history: bool) -> PVSearch:
+    """
+    Searches a position to a fixed depth, the moves sorted by closeness to
+    the centre only, or by the MoveOrdering of killers, history and centre.
+
+    Args:
+        state (GameStateHex): the position
+        depth (int): depth of the last iteration
+        killers_and_history (bool): whether to sort the moves with a MoveOrdering
+
+    Returns:
+        PVSearch: the search, with its node and cutoff counters
+    """
+    rows, cols = state.get_rep().get_dimensions()
+    me = state.get_active_player().get_piece_type()
+    other = "B" if me == "R" else "R"
+
+    def evaluate(position: GameStateHex) -> float:
+        return min(get_shortest_path_distance(position, other), 99) - min(get_shortest_path_distance(position, me), 99)
+
+    ordering = MoveOrdering.centred(rows, cols)
+
+    def order_by_centre(position: GameStateHex, actions: list, depth: int, ply: int) -> list:
+        return sorted(actions, key=lambda action: -ordering.prior[action.get_move()[0][0] * cols
+                                                                  + action.get_move()[0][1]])
+
+    if killers_and_history:
+        search = PVSearch(evaluate, transposition_table={}, move_ordering=ordering)
+    else:
+        search = PVSearch(evaluate, order_by_centre, transposition_table={})
+    search.iterative_deepening(state, INFINITY, depth)
+    return search
+
+
+def run_ordering(args) -> None:
+    for name, killers_and_history in (("centre", False), ("killers+history", True)):
+        nodes = cutoffs = first_move_cutoffs = 0
+        start = time.perf_counter()
+        for k in range(args.positions):
+            search = search_fixed_depth(make_state(args.dim, args.stones, args.seed + k), args.depth,
+                                        killers_and_history)
+            nodes += search.nodes
+            cutoffs += search.cutoffs
+            first_move_cutoffs += search.first_move_cutoffs
+        elapsed = time.perf_counter() - start
+        print(f"{name:<16} {nodes:>8} nodes  {elapsed:7.3f}s  first-move cutoffs "
+              f"{first_move_cutoffs / max(1, cutoffs):6.1%} of {cutoffs}")
+
+
+def get_partition(cells: list[str | None], find, flags: list[int]) -> list[tuple[int, int] | None]:
+    """
+    Describes stone groups independently of the shape of their trees.
+
+    Args:
+        cells (list[str | None]): piece type of every cell
+        find: function returning the root of the group of a cell
+        flags (list[int]): sides touched by the groups, valid on the roots
+
+    Returns:
+        list[tuple[int, int] | None]: smallest cell index of the group of every stone and the sides
+            the group touches, None for the empty cells
+    """
+    smallest = {}
+    for index, piece_type in enumerate(cells):
+        if piece_type is not None:
+            smallest.setdefault(find(index), index)
+    return [None if piece_type is None else (smallest[find(index)], flags[find(index)])
+            for index, piece_type in enumerate(cells)]
+
+
+def check_union_find(args) -> int:
+    """
+    Plays random games with stateful actions and compares the groups each
+    state derives from its parent with the groups rebuilt from its board.
+
+    Returns:
+        int: number of positions checked
+    """
+    positions = 0
+    for game in range(args.games):
+        rng = random.Random(args.seed + game)
+        state = make_state(args.dim, 0, args.seed + game)
+        while not state.is_done():
+            state = rng.choice(list(state.generate_possible_stateful_actions())).get_next_game_state()
+            groups, expected = state.get_groups(), HexUnionFind.from_board(state.get_rep())
+            if (get_partition(groups.cells, groups.find, groups.flags)
+                    != get_partition(expected.cells, expected.find, expected.flags)):
+                raise AssertionError(f"Game {game}, step {state.get_step()}: incremental groups differ.")
+            if groups.is_winning(state.get_last_move()[0]) != state.is_done():
+                raise AssertionError(f"Game {game}, step {state.get_step()}: wrong end of game.")
+            positions += 1
+    return positions
+
+
+def get_snapshot(search: SearchStateHex) -> tuple:
+    """
+    Copies everything `play` changes in a search state and `undo` must restore.
+
+    Returns:
+        tuple: the copies
+    """
+    return (list(search.cells), list(search.parent), list(search.size), list(search.flags), dict(search.masks),
+            sorted(search.get_empty_indices()), search.grid.tobytes(), search.zobrist, search.to_move,
+            search.step, search.winner())
+
+
+def check_make_unmake(args) -> int:
+    """
+    Plays and takes back random moves on a search state, comparing its
+    groups with HexUnionFind.from_board after every move and its whole
+    state with a snapshot after every undo.
+
+    Returns:
+        int: number of moves and undos checked
+    """
+    checked = 0
+    for game in range(args.games):
+        rng = random.Random(args.seed + game)
+        search = SearchStateHex.from_game_state(make_state(args.dim, 0, args.seed + game))
+        snapshots = []
+        for _ in range(4 * args.dim * args.dim):
+            if snapshots and (search.winner() is not None or rng.random() < 0.3):
+                search.undo()
+                if get_snapshot(search) != snapshots.pop():
+                    raise AssertionError(f"Game {game}, step {search.step}: undo did not restore the state.")
+            else:
+                snapshots.append(get_snapshot(search))
+                index = rng.choice(search.get_empty_indices())
+                search.play(index)
+                expected = HexUnionFind.from_board(search)
+                if (get_partition(search.cells, search.find, search.flags)
+                        != get_partition(expected.cells, expected.find, expected.flags)):
+                    raise AssertionError(f"Game {game}, step {search.step}: groups differ after play.")
+                # Before the first win, the game ends with the group of the new stone
+                won = expected.is_winning(divmod(index, search.dimensions[1]))
+                if snapshots[-1][-1] is None and won != (search.winner() is not None):
+                    raise AssertionError(f"Game {game}, step {search.step}: wrong winner.")
+            checked += 1
+    return checked
+
+
+def check_transposition(args) -> int:
+    """
+    Round-trips the packed entries of the transposition table at the bounds
+    of their fields, then walks the stores of one bucket through both slots.
+
+    Returns:
+        int: number of entries and slots checked
+    """
+    checked = 0
+    cells = args.dim * args.dim
+    for depth in (-128, -1, 0, 127):
+        for score in (0.0, -0.5, 100000.0, -100000.0, float("inf"), float("-inf")):
+            for flag in FLAGS:
+                for move in (NO_MOVE, 0, cells - 1, 0xFFFE):
+                    for generation in (0, GENERATIONS - 1):
+                        data = TranspositionTable.pack(depth, score, flag, move, generation)
+                        if (TranspositionTable.unpack(data) != (depth, score, flag, move) or data >= 1 << 64
+                                or data >> 42 & (GENERATIONS - 1) != generation):
+                            raise AssertionError(f"pack/unpack of {depth, score, flag, move, generation}")
+                        checked += 1
+
+    # Four buckets, and four keys of the same bucket
+    table = TranspositionTable(4 * 2 * ENTRY_BYTES / 2**20, args.dim)
+    a, b, c, d = (table.buckets * k + 1 for k in range(1, 5))
+
+    def slot_of(key: int) -> int | None:
+        for slot in (DEPTH_SLOT, ALWAYS_SLOT):
+            check, data = table.table[key & table.mask, slot].tolist()
+            if data and check ^ data == key:
+                return slot
+        return None
+
+    def expect(key: int, slot: int | None, step: str) -> None:
+        nonlocal checked
+        checked += 1
+        if slot_of(key) != slot:
+            raise AssertionError(f"{step}: key {key} is in slot {slot_of(key)}, not {slot}.")
+
+    table[a] = (5, 1.0, "EXACT", (0, 1))
+    expect(a, DEPTH_SLOT, "first store")
+    table[b] = (3, 2.0, "LOWERBOUND", None)
+    expect(a, DEPTH_SLOT, "shallower store")
+    expect(b, ALWAYS_SLOT, "shallower store")
+    table[c] = (2, 3.0, "UPPERBOUND", None)
+    expect(b, None, "second shallower store")
+    expect(c, ALWAYS_SLOT, "second shallower store")
+    table[a] = (1, 4.0, "EXACT", None)
+    expect(a, DEPTH_SLOT, "same position")
+    if table.get(a) != (1, 4.0, "EXACT", None):
+        raise AssertionError(f"same position: read back {table.get(a)}.")
+    table[d] = (1, 5.0, "EXACT", None)
+    expect(a, None, "as deep store")
+    expect(d, DEPTH_SLOT, "as deep store")
+    table[b] = (9, 6.0, "EXACT", None)
+    table.new_search()
+    expect(b, DEPTH_SLOT, "new search")
+    table[c] = (0, 7.0, "EXACT", None)
+    expect(b, None, "store over a previous search")
+    expect(c, DEPTH_SLOT, "store over a previous search")
+    table.close()
+    return checked
+
+
+def run_check(args) -> None:
+    for name, check in (("union-find", check_union_find), ("make/unmake", check_make_unmake),
+                        ("transposition", check_transposition)):
+        print(f"{name:<14} {check(args):>8} checks  ok")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="bench_hex.py", description="Micro-benchmarks of the Hex engine.")
+    parser.add_argument("-d", "--dim", type=int, default=14, help="Size of the board.")
+    parser.add_argument("-s", "--stones", type=int, default=40, help="Stones already on the board.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random position.")
+    sub = parser.add_subparsers(dest="bench", required=True)
+    board = sub.add_parser("board", help="Node throughput of the board.")
+    board.add_argument("--depth", type=int, default=2, help="Depth of the full-width expansion.")
+    board.set_defaults(func=run_board)
+    search = sub.add_parser("search", help="Node throughput of stateful actions against make/unmake moves.")
+    search.add_argument("--depth", type=int, default=2, help="Depth of the full-width expansion.")
+    search.set_defaults(func=run_search)
+    memory = sub.add_parser("memory", help="Bytes kept alive per node by a stateful-action search tree.")
+    memory.add_argument("--depth", type=int, default=2, help="Depth of the full-width expansion.")
+    memory.set_defaults(func=run_memory)
+    playout = sub.add_parser("playout", help="Throughput of the random playout engines.")
+    playout.add_argument("-n", "--count", type=int, default=20000, help="Number of playouts.")
+    playout.add_argument("-b", "--batch", type=int, default=4096, help="Boards per BatchPlayout call.")
+    playout.set_defaults(func=run_playout)
+    rave = sub.add_parser("rave", help="Games of RAVE against plain UCT, at equal playouts then equal time.")
+    rave.add_argument("-g", "--games", type=int, default=10, help="Number of games of each match.")
+    rave.add_argument("-p", "--playouts", type=int, default=1000, help="Playouts per move of the first match.")
+    rave.add_argument("-t", "--time", type=float, default=0.1, help="Seconds per move of the second match.")
+    rave.add_argument("-k", "--equivalence", type=float, default=300.0, help="RAVE equivalence parameter.")
+    rave.add_argument("-e", "--exploration", type=float, default=0.5, help="UCT exploration constant.")
+    rave.set_defaults(func=run_rave)
+    ordering = sub.add_parser("ordering", help="Nodes and first-move cutoffs of PVS to a fixed depth, by move ordering.")
+    ordering.add_argument("--depth", type=int, default=3, help="Depth of the search.")
+    ordering.add_argument("-n", "--positions", type=int, default=5, help="Number of random positions.")
+    ordering.set_defaults(func=run_ordering)
+    check = sub.add_parser("check", help="Self-checks of the incremental structures against a rebuild.")
+    check.add_argument("-g", "--games", type=int, default=20, help="Number of random games.")
+    check.set_defaults(func=run_check)
+
+    args = parser.parse_args()
+    args.func(args)
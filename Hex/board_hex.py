@@ -1,13 +1,70 @@
 from __future__ import annotations
 import json
+from functools import lru_cache
 from typing import Generator
+import numpy as np
 from colorama import Fore, Style
 from seahorse.game.game_layout.board import Board, Piece
 
+from empty_cells_hex import EmptyCells
+from geometry_hex import NEIGHBOUR_OFFSETS, get_geometry
+
+# Longest chain of unmaterialized boards allowed before a copy is flattened.
+MAX_CHAIN_LENGTH = 32
+
+# Value of each cell content in the int8 grid returned by `get_grid_array`.
+GRID_CODES = {None: 0, "R": 1, "B": 2}
+
+# Character of an empty cell in the compact JSON encoding of a board.
+EMPTY_CHAR = "."
+
+
+@lru_cache(maxsize=None)
+def get_shared_piece(piece_type: str, owner_id: int = -1) -> Piece:
+    """
+    Returns the piece shared by every board for a piece type and an owner.
+
+    Pieces hash and compare by type and owner id only, so one instance per
+    player is enough for a whole game. The shared pieces must not be modified.
+
+    Args:
+        piece_type (str): "R" or "B"
+        owner_id (int): id of the owner, -1 if unknown
+
+    Returns:
+        Piece: the shared piece
+    """
+    return Piece(piece_type=piece_type, owner_id=owner_id)
+
+
+def parse_position(key: str) -> tuple[int, int]:
+    """
+    Parses a "(i, j)" env key of the verbose JSON encoding without eval.
+
+    Args:
+        key (str): the key, as written by str(tuple)
+
+    Returns:
+        tuple[int, int]: the coordinates
+    """
+    i, j = key.strip("()").split(",")
+    return (int(i), int(j))
+
+
 class BoardHex(Board):
     """
     A class representing an Hex board.
 
+    Boards created by `with_piece` share structure with their parent: they
+    only store the parent and the added piece, and build their own env
+    dictionary the first time it is read. The set of empty cells is kept
+    the same way, derived from the parent's set on first use, so pieces
+    must be added through `with_piece` rather than by writing into env.
+    The int8 grid of `get_grid_array` follows the same scheme.
+
+    The pieces of a board come from `get_shared_piece`, so a board derived
+    during a search costs a few dozen bytes.
+
     Attributes:
         env (dict[tuple[int], Piece]): The environment dictionary composed of pieces.
         dimension (int): The dimension of the board.
@@ -16,6 +73,55 @@ class BoardHex(Board):
     def __init__(self, env: dict[tuple[int], Piece], dim: list[int]) -> None:
         super().__init__(env, dim)
 
+    @property
+    def env(self) -> dict[tuple[int], Piece]:
+        if self._env is None:
+            self._materialize()
+        return self._env
+
+    @env.setter
+    def env(self, env: dict[tuple[int], Piece]) -> None:
+        self._env = env
+        self._parent = None
+        self._move = None
+        self._chain_length = 0
+        self._empty = None
+        self._grid = None
+
+    def _materialize(self) -> None:
+        """
+        Builds the env dictionary of a shared board from its chain of parents,
+        then drops the chain so that older boards can be garbage collected.
+        """
+        moves = []
+        board = self
+        while board._env is None:
+            moves.append(board._move)
+            board = board._parent
+        env = dict(board._env)
+        for position, piece in reversed(moves):
+            env[position] = piece
+        empty, grid = self._empty, self._grid
+        self.env = env
+        self._empty, self._grid = empty, grid
+
+    def _lookup(self, position: tuple[int, int]) -> Piece | None:
+        """
+        Returns the piece on a cell without building the env of a shared board.
+
+        Args:
+            position (tuple[int, int]): coordinates of the cell
+
+        Returns:
+            Piece | None: the piece on the cell, None if it is empty
+        """
+        board = self
+        while board._env is None:
+            if board._move[0] == position:
+                return board._move[1]
+            board = board._parent
+        return board._env.get(position)
+
     def __str__(self):
         grid_data = self.get_grid()
         board_string = ""
@@ -45,20 +151,48 @@ class BoardHex(Board):
         Returns:
             dict[str,tuple[str,tuple[int,int]]]: dictionnary of the neighbours of the cell (i,j)
         """
-        positions = {"top_right":(i-1, j+1), "top_left":(i-1,j), 
-                     "bot_left":(i+1, j-1), "bot_right":(i+1,j), 
-                     "left":(i,j-1), "right":(i,j+1)}
+        rows, cols = self.dimensions
         neighbours: dict[str,tuple[str|Piece,tuple[int,int]]] = {}
-        for k,v in positions.items():
+        if 0 <= i < rows and 0 <= j < cols:
+            for k, v, n in get_geometry(rows, cols).named_neighbours[i * cols + j]:
+                if n < 0:
+                    neighbours[k] = ("OUTSIDE", v)
+                else:
+                    piece = self._lookup(v)
+                    neighbours[k] = ("EMPTY", v) if piece is None else (piece.get_type(), v)
+            return neighbours
+        for k, (di, dj) in NEIGHBOUR_OFFSETS.items():
+            v = (i + di, j + dj)
             if v not in self.env.keys():
-                if v[0] < 0 or v[1] < 0 or v[0] >= self.dimensions[0] or v[1] >= self.dimensions[1]:
-                    neighbours[k] = ("OUTSIDE", positions[k])
+                if v[0] < 0 or v[1] < 0 or v[0] >= rows or v[1] >= cols:
+                    neighbours[k] = ("OUTSIDE", v)
                 else:
-                    neighbours[k] = ("EMPTY",positions[k])
+                    neighbours[k] = ("EMPTY", v)
             else:
-                neighbours[k] = (self.env[v].get_type(),v)
+                neighbours[k] = (self.env[v].get_type(), v)
         return neighbours
 
+    def get_cells(self) -> list[str | None]:
+        """
+        Returns the piece type of every cell as a flat list indexed by i*cols+j,
+        the indexing used by the tables of `geometry_hex`.
+
+        Returns:
+            list[str | None]: "R", "B" or None for every cell
+        """
+        cols = self.dimensions[1]
+        cells: list[str | None] = [None] * (self.dimensions[0] * cols)
+        moves = []
+        board = self
+        while board._env is None:
+            moves.append(board._move)
+            board = board._parent
+        for (i, j), piece in board._env.items():
+            cells[i * cols + j] = piece.get_type()
+        for (i, j), piece in moves:
+            cells[i * cols + j] = piece.get_type()
+        return cells
+
     def get_grid(self) -> list[list[int|str|tuple[str,str]]]:
         """
         Return a nice representation of the board.
@@ -77,6 +211,30 @@ class BoardHex(Board):
          
         return grid_data
     
+    def get_grid_array(self) -> np.ndarray:
+        """
+        Returns the board as a read-only int8 array of shape (rows, cols), with
+        0 for an empty cell, 1 for "R" and 2 for "B" (see GRID_CODES).
+
+        The grid is built on first use, from a copy of the parent's grid when
+        the board shares structure with it.
+
+        Returns:
+            np.ndarray: the grid, it must not be modified
+        """
+        if self._grid is None:
+            parent = self._parent
+            if parent is not None and parent._grid is not None:
+                position, piece = self._move
+                grid = parent._grid.copy()
+                grid[position] = GRID_CODES[piece.get_type()]
+            else:
+                grid = np.array([GRID_CODES[t] for t in self.get_cells()], dtype=np.int8)
+                grid = grid.reshape(self.dimensions[0], self.dimensions[1])
+            grid.flags.writeable = False
+            self._grid = grid
+        return self._grid
+
     def get_empty(self) -> Generator[tuple[int, int], None, None]:
         """
         Returns a list of empty cells in the grid.
@@ -84,29 +242,108 @@ class BoardHex(Board):
         Returns:
             list[tuple[int, int]]: A list of tuples representing the coordinates of empty cells.
         """
-        for i in range(self.dimensions[0]):
-            for j in range(self.dimensions[1]):
-                if (i,j) not in self.env:
-                    yield (i,j)
+        coords = get_geometry(*self.dimensions).coords
+        for index in self.get_empty_cells().cells:
+            yield coords[index]
+
+    def get_empty_cells(self) -> EmptyCells:
+        """
+        Returns the indexed set of the empty cells, built on first use from the
+        parent's set when the board shares structure with it.
+
+        Returns:
+            EmptyCells: the empty cells, it must not be modified
+        """
+        if self._empty is None:
+            parent = self._parent
+            if parent is not None and parent._empty is not None:
+                (i, j), _ = self._move
+                self._empty = parent._empty.copy()
+                self._empty.remove(i * self.dimensions[1] + j)
+            else:
+                self._empty = EmptyCells(self.get_cells())
+        return self._empty
+
+    def get_empty_count(self) -> int:
+        """
+        Returns the number of empty cells.
+
+        Returns:
+            int: the number of empty cells
+        """
+        return len(self.get_empty_cells())
        
-    def to_json(self) -> dict:
+    def with_piece(self, position: tuple[int, int], piece: Piece) -> BoardHex:
+        """
+        Returns a new board equal to this one with an extra piece placed.
+
+        Args:
+            position (tuple[int, int]): coordinates of the new piece
+            piece (Piece): the piece to place
+
+        Returns:
+            BoardHex: the new board, this board is left unchanged
+        """
+        if self._chain_length >= MAX_CHAIN_LENGTH:
+            self._materialize()
+        board = type(self).__new__(type(self))
+        board.dimensions = self.dimensions
+        board._env = None
+        board._parent = self
+        board._move = (position, piece)
+        board._chain_length = self._chain_length + 1
+        board._empty = None
+        board._grid = None
+        return board
+
+    def to_json(self, compact: bool = False) -> dict:
         """
         Converts the board to a JSON object.
 
+        The compact encoding stores the board as one row-major string with a
+        character per cell ("R", "B" or "."), plus the owner id of each piece
+        type, instead of one object per piece.
+
+        Args:
+            compact (bool): whether to use the compact encoding
+
         Returns:
             dict: The JSON representation of the board.
         """
+        if compact:
+            owners = {}
+            for piece in self.env.values():
+                owners.setdefault(piece.get_type(), piece.get_owner_id())
+                if len(owners) == 2:
+                    break
+            cells = "".join(EMPTY_CHAR if t is None else t for t in self.get_cells())
+            return {"cells": cells, "dim": self.dimensions, "owners": owners}
         return {"env":{str(x):y.to_json() for x,y in self.env.items()},"dim":self.dimensions}
 
     @classmethod
     def from_json(cls, data: str | dict) -> BoardHex:
+        """
+        Builds a board from either JSON encoding written by `to_json`.
+
+        Args:
+            data (str | dict): The JSON representation of the board.
+
+        Returns:
+            BoardHex: The board.
+        """
         if isinstance(data, str):
             data = json.loads(data)
-        else:
-            data = data
+
+        if "cells" in data:
+            cols = data["dim"][1]
+            owners = data.get("owners", {})
+            pieces = {t: get_shared_piece(t, owners.get(t, -1)) for t in ("R", "B")}
+            env = {(index // cols, index % cols): pieces[t]
+                   for index, t in enumerate(data["cells"]) if t != EMPTY_CHAR}
+            return cls(env=env, dim=list(data["dim"]))
 
         return cls(**{
-            "env": {eval(x): Piece.from_json(y)
+            "env": {parse_position(x): get_shared_piece(y["piece_type"], y.get("owner_id", -1))
                     for x, y in data["env"].items()},
             "dim": data["dim"]
         })
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+
+class EmptyCells:
+    """
+    Indexed set of the empty cells of a board.
+
+    Cell indices are stored in a flat list, and each cell remembers its slot
+    in that list, so a cell is removed in O(1) by swapping it with the last
+    one. Iteration follows the list, so its order is not row-major.
+
+    Attributes:
+        cells (list[int]): indices of the empty cells
+        slots (list[int]): slot of every cell in `cells`, -1 if the cell is occupied
+    """
+
+    __slots__ = ("cells", "slots")
+
+    def __init__(self, cells: list[str | None]) -> None:
+        self.cells = [index for index, piece_type in enumerate(cells) if piece_type is None]
+        self.slots = [-1] * len(cells)
+        for slot, index in enumerate(self.cells):
+            self.slots[index] = slot
+
+    def copy(self) -> EmptyCells:
+        """
+        Returns an independent copy of the set.
+
+        Returns:
+            EmptyCells: the copy
+        """
+        empty = EmptyCells.__new__(EmptyCells)
+        empty.cells = self.cells.copy()
+        empty.slots = self.slots.copy()
+        return empty
+
+    def remove(self, index: int) -> None:
+        """
+        Removes a cell from the set in O(1).
+
+        Args:
+            index (int): index of an empty cell
+        """
+        slot = self.slots[index]
+        last = self.cells.pop()
+        if last != index:
+            self.cells[slot] = last
+            self.slots[last] = slot
+        self.slots[index] = -1
+
+    def add(self, index: int) -> None:
+        """
+        Adds a cell back to the set in O(1).
+
+        Args:
+            index (int): index of an occupied cell
+        """
+        self.slots[index] = len(self.cells)
+        self.cells.append(index)
+
+    def __contains__(self, index: int) -> bool:
+        return self.slots[index] >= 0
+
+    def __len__(self) -> int:
+        return len(self.cells)
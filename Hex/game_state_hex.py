@@ -1,9 +1,13 @@
-import copy
 import json
+from functools import lru_cache
 from typing import Generator, Optional
 
-from board_hex import BoardHex
+from board_hex import BoardHex, get_shared_piece
 from player_hex import PlayerHex
+from stateful_action_hex import LazyStatefulAction
+from symmetry_hex import ROTATION, get_symmetry_tables
+from union_find_hex import HexUnionFind
+from zobrist_hex import compute_zobrist, get_zobrist_table
 
 from seahorse.game.game_layout.board import Piece
 from seahorse.game.game_state import GameState
@@ -13,21 +17,60 @@ from seahorse.utils.serializer import Serializable
 from seahorse.player.proxies import RemotePlayerProxy, LocalPlayerProxy, InteractivePlayerProxy
 
 
+@lru_cache(maxsize=None)
+def get_shared_scores(player1: int, player2: int) -> tuple[dict[int, float], dict[int, float], dict[int, float]]:
+    """
+    Returns the only three score dictionaries a game can reach, shared by
+    every state so that a new state allocates none. They must not be modified.
+
+    Args:
+        player1 (int): The ID of the first player.
+        player2 (int): The ID of the second player.
+
+    Returns:
+        tuple[dict[int, float], dict[int, float], dict[int, float]]: The scores with no winner,
+            when the first player wins and when the second player wins.
+    """
+    return {player1: 0, player2: 0}, {player1: 1.0, player2: 0.0}, {player1: 0.0, player2: 1.0}
+
+
 class GameStateHex(GameState):
     """
     A class representing the state of an Hex game.
 
+    States share their pieces and score dictionaries with every other state
+    of the game, to keep search trees small in memory.
+
     Attributes:
         score (list[float]): Scores of the state for each player.
         active_player (Player): Next player to play.
         players (list[Player]): list of players.
         rep (Representation): Representation of the game.
+        groups (HexUnionFind | None): Stone groups of the board, built on first use when not given.
+        parent_groups (HexUnionFind | None): Groups of the parent state, the groups are derived from them and last_move on first use.
+        zobrist (int | None): Zobrist key of the board, computed on first use when not given.
+        rotated_zobrist (int | None): Zobrist key of the board turned by 180 degrees, computed on first use when not given.
+        last_move (tuple[tuple[int, int], str] | None): (position, piece type) of the move that led to this state, if known.
+        compact_json (bool): Whether `to_json` writes the board with its compact encoding, shared by every state.
     """
 
-    def __init__(self, scores: dict, active_player: PlayerHex, players: list[PlayerHex], rep: BoardHex, step: int,  *args, **kwargs) -> None:
+    compact_json = False
+
+    def __init__(self, scores: dict, active_player: PlayerHex, players: list[PlayerHex], rep: BoardHex, step: int,  *args,
+                 groups: HexUnionFind | None = None, parent_groups: HexUnionFind | None = None,
+                 zobrist: int | None = None, rotated_zobrist: int | None = None,
+                 last_move: tuple[tuple[int, int], str] | None = None, **kwargs) -> None:
         super().__init__(scores, active_player, players, rep)
-        self.max_step = rep.get_dimensions()[0] * rep.get_dimensions()[1]  # + 1 #+1 for the swap
         self.step = step
+        self.groups = groups
+        self.parent_groups = parent_groups
+        self.zobrist = zobrist
+        self.rotated_zobrist = rotated_zobrist
+        self.last_move = last_move
+
+    @property
+    def max_step(self) -> int:
+        return self.rep.get_dimensions()[0] * self.rep.get_dimensions()[1]  # + 1 #+1 for the swap
 
     def get_step(self) -> int:
         """
@@ -49,6 +92,58 @@ class GameStateHex(GameState):
             return True
         return False
 
+    def get_groups(self) -> HexUnionFind:
+        """
+        Return the stone groups of the board, building them on first use.
+
+        Returns:
+            HexUnionFind: The stone groups of the board.
+        """
+        if self.groups is None:
+            if self.parent_groups is not None:
+                position, piece_type = self.last_move
+                self.groups = self.parent_groups.with_stone(position, piece_type)
+                self.parent_groups = None
+            else:
+                self.groups = HexUnionFind.from_board(self.get_rep())
+        return self.groups
+
+    def get_zobrist(self) -> int:
+        """
+        Return the 64-bit Zobrist key of the board, a cheap hash shared by every
+        player and process for a given position.
+
+        Returns:
+            int: The Zobrist key of the board.
+        """
+        if self.zobrist is None:
+            rows, cols = self.get_rep().get_dimensions()
+            self.zobrist = compute_zobrist(self.get_rep().get_cells(), rows, cols)
+        return self.zobrist
+
+    def get_rotated_zobrist(self) -> int:
+        """
+        Return the Zobrist key of the board turned by 180 degrees, kept up to
+        date from move to move like the Zobrist key, for the canonical keys.
+
+        Returns:
+            int: The Zobrist key of the rotated board.
+        """
+        if self.rotated_zobrist is None:
+            rows, cols = self.get_rep().get_dimensions()
+            self.rotated_zobrist = get_symmetry_tables(rows, cols).get_keys(
+                self.get_rep().get_cells(), "R", (ROTATION,))[ROTATION]
+        return self.rotated_zobrist
+
+    def get_last_move(self) -> tuple[tuple[int, int], str] | None:
+        """
+        Return the move that led to this state.
+
+        Returns:
+            tuple[tuple[int, int], str] | None: The position and piece type of the move, None if unknown.
+        """
+        return self.last_move
+
     def get_neighbours(self, i: int, j: int) -> dict[str, tuple[str | Piece, tuple[int, int]]]:
         return self.get_rep().get_neighbours(i, j)
 
@@ -84,29 +179,15 @@ class GameStateHex(GameState):
         """
         Generate possible actions.
 
+        The next game state of each action is only built when it is first accessed.
+
         Returns:
             Generator[StatefulAction]: Generator of possible stateful actions.
         """
 
+        piece_type = self.get_active_player().get_piece_type()
         for position in self.rep.get_empty():
-            piece_type = self.get_active_player().get_piece_type()
-            current_rep = self.get_rep()
-            b = current_rep.get_env()
-            d = current_rep.get_dimensions()
-            copy_b = copy.copy(b)
-            copy_b[position] = Piece(
-                piece_type=piece_type, owner=self.get_active_player())
-            new_board = BoardHex(env=copy_b, dim=d)
-            play_info = (position, piece_type,
-                         self.get_active_player().get_id())
-            new_state = GameStateHex(
-                self.compute_scores(play_info=play_info),
-                self.compute_next_player(),
-                self.players,
-                new_board,
-                step=self.step + 1,
-            )
-            yield StatefulAction(self, new_state)
+            yield LazyStatefulAction(self, position, piece_type)
 
     def generate_possible_stateless_actions(self) -> Generator[StatelessAction, None, None]:
         """
@@ -144,21 +225,42 @@ class GameStateHex(GameState):
                 self.players,
                 current_rep,
                 step=self.step,
+                groups=self.groups,
+                parent_groups=self.parent_groups,
+                zobrist=self.zobrist,
+                rotated_zobrist=self.rotated_zobrist,
+                last_move=self.last_move,
             )
 
-        b = current_rep.get_env()
-        d = current_rep.get_dimensions()
-        copy_b = copy.copy(b)
-        copy_b[position] = Piece(
-            piece_type=piece_type, owner=self.get_active_player())
-        new_board = BoardHex(env=copy_b, dim=d)
-        play_info = (position, piece_type, self.active_player.get_id())
+        return self._next_state(position, piece_type)
+
+    def _next_state(self, position: tuple[int, int], piece_type: str) -> "GameStateHex":
+        """
+        Build the state reached when the active player places a piece on an empty cell.
+
+        Args:
+            position (tuple[int, int]): The empty cell.
+            piece_type (str): The type of the piece to place.
+
+        Returns:
+            GameStateHex: The new game state.
+        """
+        new_board = self.get_rep().with_piece(position, get_shared_piece(piece_type, self.active_player.get_id()))
+        groups = self.get_groups()
+        rows, cols = self.get_rep().get_dimensions()
+        index = position[0] * cols + position[1]
+        zobrist = self.get_zobrist() ^ get_zobrist_table(rows, cols)[piece_type][index]
+        rotated_zobrist = self.get_rotated_zobrist() ^ get_symmetry_tables(rows, cols).keys[ROTATION][piece_type][index]
         return GameStateHex(
-            self.compute_scores(play_info=play_info),
+            self._scores_from_groups(groups, position, piece_type, self.active_player.get_id()),
             self.compute_next_player(),
             self.players,
             new_board,
             step=self.step + 1,
+            parent_groups=groups,
+            zobrist=zobrist,
+            rotated_zobrist=rotated_zobrist,
+            last_move=(position, piece_type),
         )
 
     def convert_stateful_action_to_stateless_action(self, stateful_action: StatefulAction) -> StatelessAction:
@@ -175,15 +277,20 @@ class GameStateHex(GameState):
             raise ValueError(
                 "The action must be an instance of StatefulAction.")
 
-        current_state = stateful_action.get_current_game_state()
-        next_state = stateful_action.get_next_game_state()
+        if isinstance(stateful_action, LazyStatefulAction):
+            position, piece_type = stateful_action.get_move()
+            return StatelessAction({"piece": piece_type, "position": position})
 
-        dim = current_state.get_rep().get_dimensions()[0]
-        for i in range(dim):
-            for j in range(dim):
-                if current_state.get_rep().get_env().get((i, j)) != next_state.get_rep().get_env().get((i, j)):
-                    piece_type = next_state.get_rep().get_env().get((i, j)).get_type()
-                    return StatelessAction({"piece": piece_type, "position": (i, j)})
+        next_state = stateful_action.get_next_game_state()
+        if isinstance(next_state, GameStateHex) and next_state.get_last_move() is not None:
+            position, piece_type = next_state.get_last_move()
+            return StatelessAction({"piece": piece_type, "position": position})
+
+        # Actions built elsewhere may not carry their move: diff the two boards
+        current_env = stateful_action.get_current_game_state().get_rep().get_env()
+        for position, piece in next_state.get_rep().get_env().items():
+            if current_env.get(position) is None:
+                return StatelessAction({"piece": piece.get_type(), "position": position})
         raise ValueError("No stateless action found in the action.")
 
     def convert_gui_data_to_action_data(self, gui_data: dict) -> dict:
@@ -212,53 +319,26 @@ class GameStateHex(GameState):
         pos, piece_type, id_player = play_info
         if self.get_rep().get_env().get(pos) is not None and self.step == 1:
             return {player1: 0.0, player2: 0.0}
-        self.get_rep().get_env()[pos] = Piece(
-            piece_type=piece_type, owner=self.get_player_id(id_player))
-        dim = self.get_rep().get_dimensions()[0]
-        visited = set()
-
-        def dfs_bot(i, j):
-            if (i, j) in visited:
-                return False
-            visited.add((i, j))
-            if i == dim-1:
-                return True
-            for k, v in self.get_neighbours(i, j).items():
-                t, (ni, nj) = v
-                if t == piece_type and (ni, nj) not in visited:
-                    if dfs_bot(ni, nj):
-                        return True
-            return False
+        return self._scores_from_groups(self.get_groups(), pos, piece_type, id_player)
 
-        def dfs_right(i, j):
-            if (i, j) in visited:
-                return False
-            visited.add((i, j))
-            if j == dim-1:
-                return True
-            for k, v in self.get_neighbours(i, j).items():
-                t, (ni, nj) = v
-                if t == piece_type and (ni, nj) not in visited:
-                    if dfs_right(ni, nj):
-                        return True
-            return False
+    def _scores_from_groups(self, groups: HexUnionFind, pos: tuple[int, int], piece_type: str, id_player: int) -> dict[int, float]:
+        """
+        Compute the scores reached by adding a piece to the stone groups of the board.
 
-        if id_player == player1:
-            for j in range(dim):
-                piece = self.get_rep().get_env().get((0, j), -1)
-                if piece != -1 and piece.get_type() == piece_type:
-                    if dfs_bot(0, j):
-                        self.get_rep().get_env().pop(pos)
-                        return {player1: 1.0, player2: 0.0}
-        else:
-            for i in range(dim):
-                piece = self.get_rep().get_env().get((i, 0), -1)
-                if piece != -1 and piece.get_type() == piece_type:
-                    if dfs_right(i, 0):
-                        self.get_rep().get_env().pop(pos)
-                        return {player1: 0.0, player2: 1.0}
-        self.get_rep().get_env().pop(pos)
-        return {player1: 0, player2: 0}
+        Args:
+            groups (HexUnionFind): The stone groups before the new piece.
+            pos (tuple[int, int]): The position of the new piece.
+            piece_type (str): The type of the new piece.
+            id_player (int): The ID of the player who placed it.
+
+        Returns:
+            dict[int, float]: A dictionary with player ID as the key and score as the value.
+        """
+        player1 = self.players[0].id
+        no_winner, player1_wins, player2_wins = get_shared_scores(player1, self.players[1].id)
+        if groups.wins_with_stone(pos, piece_type):
+            return player1_wins if id_player == player1 else player2_wins
+        return no_winner
 
     def __str__(self) -> str:
         if not self.is_done():
@@ -269,7 +349,7 @@ class GameStateHex(GameState):
         return {"scores": self.scores,
                 "players": [x.to_json() for x in self.players],
                 "active_player": self.active_player.to_json(),
-                "rep": self.rep.to_json(),
+                "rep": self.rep.to_json(compact=self.compact_json),
                 "step": self.step
                 }
 
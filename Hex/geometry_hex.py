@@ -0,0 +1,98 @@
+from __future__ import annotations
+from functools import lru_cache
+
+NEIGHBOUR_OFFSETS = {"top_right": (-1, 1), "top_left": (-1, 0),
+                     "bot_left": (1, -1), "bot_right": (1, 0),
+                     "left": (0, -1), "right": (0, 1)}
+
+# (destination offset, (carrier offset, carrier offset)) of the six bridges:
+# the destination is reached through either of the two empty carrier cells.
+BRIDGE_OFFSETS = (
+    ((-1, 2), ((0, 1), (-1, 1))),
+    ((1, 1), ((0, 1), (1, 0))),
+    ((2, -1), ((1, 0), (1, -1))),
+    ((1, -2), ((0, -1), (1, -1))),
+    ((-1, -1), ((0, -1), (-1, 0))),
+    ((-2, 1), ((-1, 0), (-1, 1))),
+)
+
+
+class HexGeometry:
+    """
+    Topology tables of an Hex board, built once per board size.
+
+    Cell (i,j) is identified by its index i*cols+j. Every table is a tuple
+    indexed by cell index, so the innermost loops of the heuristics walk flat
+    integer tuples instead of calling `BoardHex.get_neighbours`.
+
+    Attributes:
+        rows (int): number of lines of the board
+        cols (int): number of columns of the board
+        size (int): number of cells
+        coords (tuple[tuple[int, int], ...]): (i,j) coordinates of every cell
+        neighbours (tuple[tuple[int, ...], ...]): indices of the in-board neighbours of every cell
+        named_neighbours (tuple): (name, (ni,nj), index) for the six directions of every cell, index being -1 outside of the board
+        bridges (tuple[tuple[tuple[int, int, int], ...], ...]): (destination, carrier, carrier) indices of the in-board bridges of every cell
+        top, bottom, left, right (tuple[int, ...]): indices of the cells of each side
+        top_mask, bottom_mask, left_mask, right_mask (int): bitmasks of each side
+    """
+
+    def __init__(self, rows: int, cols: int) -> None:
+        self.rows = rows
+        self.cols = cols
+        self.size = rows * cols
+        self.coords = tuple((i, j) for i in range(rows) for j in range(cols))
+
+        named, neighbours, bridges = [], [], []
+        for i, j in self.coords:
+            cell = tuple((name, (i + di, j + dj), self.index(i + di, j + dj))
+                         for name, (di, dj) in NEIGHBOUR_OFFSETS.items())
+            named.append(cell)
+            neighbours.append(tuple(n for _, _, n in cell if n >= 0))
+            cell_bridges = []
+            for (dr, dc), ((ar, ac), (br, bc)) in BRIDGE_OFFSETS:
+                dest = self.index(i + dr, j + dc)
+                a, b = self.index(i + ar, j + ac), self.index(i + br, j + bc)
+                if dest >= 0 and a >= 0 and b >= 0:
+                    cell_bridges.append((dest, a, b))
+            bridges.append(tuple(cell_bridges))
+        self.named_neighbours = tuple(named)
+        self.neighbours = tuple(neighbours)
+        self.bridges = tuple(bridges)
+
+        self.top = tuple(range(cols))
+        self.bottom = tuple((rows - 1) * cols + j for j in range(cols))
+        self.left = tuple(i * cols for i in range(rows))
+        self.right = tuple(i * cols + cols - 1 for i in range(rows))
+        self.top_mask, self.bottom_mask, self.left_mask, self.right_mask = (
+            sum(1 << n for n in side) for side in (self.top, self.bottom, self.left, self.right))
+
+    def index(self, i: int, j: int) -> int:
+        """
+        Returns the index of the cell (i,j).
+
+        Args:
+            i (int): line indice
+            j (int): column indice
+
+        Returns:
+            int: the index of the cell, -1 if it lies outside of the board
+        """
+        if 0 <= i < self.rows and 0 <= j < self.cols:
+            return i * self.cols + j
+        return -1
+
+
+@lru_cache(maxsize=None)
+def get_geometry(rows: int, cols: int) -> HexGeometry:
+    """
+    Returns the topology tables of a board size, building them on first use.
+
+    Args:
+        rows (int): number of lines of the board
+        cols (int): number of columns of the board
+
+    Returns:
+        HexGeometry: the cached tables
+    """
+    return HexGeometry(rows, cols)
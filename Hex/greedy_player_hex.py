@@ -1,5 +1,7 @@
 import numpy as np
 import heapq
+from board_hex import GRID_CODES
+from geometry_hex import get_geometry
 from player_hex import PlayerHex
 from game_state_hex import GameStateHex
 from seahorse.game.action import Action
@@ -38,17 +40,19 @@ class MyPlayer(PlayerHex):
         _possible_actions = current_state.get_possible_stateless_actions()
 
         # Greedily find a shortest path connecting the 2 sides, and play closest to the center on it.
-        env = current_state.rep.env
-        dist = np.full((current_state.rep.dimensions[0], current_state.rep.dimensions[1]), np.inf)
-        preds = np.full((current_state.rep.dimensions[0], current_state.rep.dimensions[1]), None, dtype=tuple)
+        grid = current_state.rep.get_grid_array()
+        rows, cols = current_state.rep.dimensions
+        mine = GRID_CODES[self.piece_type]
+        dist = np.full((rows, cols), np.inf)
+        preds = np.full((rows, cols), None, dtype=tuple)
         objectives = []
         pq = []
         if self.piece_type == "R":
-            for j in range(current_state.rep.dimensions[1]):
-                objectives.append((current_state.rep.dimensions[0]-1, j))
-                if env.get((0,j)) is None:
+            for j in range(cols):
+                objectives.append((rows-1, j))
+                if grid[0, j] == 0:
                     dist[0, j] = 1
-                elif env.get((0,j)).piece_type == "R":
+                elif grid[0, j] == mine:
                     dist[0, j] = 0
                 else:
                     continue
@@ -56,11 +60,11 @@ class MyPlayer(PlayerHex):
 
 
         else:
-            for i in range(current_state.rep.dimensions[0]):
-                objectives.append((i, current_state.rep.dimensions[1]-1))
-                if env.get((i,0)) is None:
+            for i in range(rows):
+                objectives.append((i, cols-1))
+                if grid[i, 0] == 0:
                     dist[i, 0] = 1
-                elif env.get((i,0)).piece_type == "B":
+                elif grid[i, 0] == mine:
                     dist[i, 0] = 0
                 else:
                     continue
@@ -75,11 +79,12 @@ class MyPlayer(PlayerHex):
             if (i,j) in objectives:
                 path = retrace_path(preds, (i,j))
                 break
-            for n_type, (ni, nj) in current_state.rep.get_neighbours(i, j).values():
-                if n_type == "EMPTY":
+            for n in get_geometry(rows, cols).neighbours[i * cols + j]:
+                ni, nj = divmod(n, cols)
+                if grid[ni, nj] == 0:
                     new_dist = d + 1
-                elif n_type == self.piece_type:
-                    new_dist = d 
+                elif grid[ni, nj] == mine:
+                    new_dist = d
                 else:
                     continue
                 if new_dist < dist[ni, nj]:
@@ -88,7 +93,7 @@ class MyPlayer(PlayerHex):
         
         hq = []
         for pos in path:
-            if env.get(pos) == None:
+            if grid[pos] == 0:
                 heapq.heappush(hq, (abs(pos[0]-6.5) + abs(pos[1]-6.5), pos))
         _ , pos = heapq.heappop(hq)
         return StatelessAction({"piece": self.piece_type, "position": pos})
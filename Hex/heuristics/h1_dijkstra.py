@@ -1,42 +1,41 @@
 import heapq
+from geometry_hex import get_geometry
 
 def get_shortest_path_distance(state, piece_type):
     board = state.get_rep()
-    env = board.get_env()
     rows, cols = board.get_dimensions()
+    geo = get_geometry(rows, cols)
+    cells = board.get_cells()
+    neighbours = geo.neighbours
     pq = []
     dist_map = {}
 
     if piece_type == "R":
-        for j in range(cols):
-            piece = env.get((0, j))
-            d = 1 if piece is None else (0 if piece.get_type() == "R" else None)
-            if d is not None:
-                dist_map[(0, j)] = d
-                heapq.heappush(pq, (d, 0, j))
+        start, goal = geo.top, geo.bottom
     else:
-        for i in range(rows):
-            piece = env.get((i, 0))
-            d = 1 if piece is None else (0 if piece.get_type() == "B" else None)
-            if d is not None:
-                dist_map[(i, 0)] = d
-                heapq.heappush(pq, (d, i, 0))
+        start, goal = geo.left, geo.right
+    goal = set(goal)
+    for u in start:
+        piece = cells[u]
+        d = 1 if piece is None else (0 if piece == piece_type else None)
+        if d is not None:
+            dist_map[u] = d
+            heapq.heappush(pq, (d, u))
 
     while pq:
-        d, r, c = heapq.heappop(pq)
-        if d > dist_map.get((r, c), float("inf")): continue
-        if (piece_type == "R" and r == rows - 1) or (piece_type == "B" and c == cols - 1):
+        d, u = heapq.heappop(pq)
+        if d > dist_map.get(u, float("inf")): continue
+        if u in goal:
             return d
-        for _, (_, (nr, nc)) in board.get_neighbours(r, c).items():
-            if 0 <= nr < rows and 0 <= nc < cols:
-                np = env.get((nr, nc))
-                if np is None: weight = 1
-                elif np.get_type() == piece_type: weight = 0
-                else: continue
-                new_dist = d + weight
-                if new_dist < dist_map.get((nr, nc), float("inf")):
-                    dist_map[(nr, nc)] = new_dist
-                    heapq.heappush(pq, (new_dist, nr, nc))
+        for v in neighbours[u]:
+            np = cells[v]
+            if np is None: weight = 1
+            elif np == piece_type: weight = 0
+            else: continue
+            new_dist = d + weight
+            if new_dist < dist_map.get(v, float("inf")):
+                dist_map[v] = new_dist
+                heapq.heappush(pq, (new_dist, v))
     return float("inf")
 
 def h1_two_distance(state, player_piece):
@@ -1,43 +1,44 @@
+from functools import lru_cache
+
 import numpy as np
+from board_hex import GRID_CODES
+from geometry_hex import get_geometry
+
+@lru_cache(maxsize=None)
+def _circuit_edges(dim):
+    """(u, v) arrays of the cell-to-cell edges, each edge listed once with u < v."""
+    geo = get_geometry(dim, dim)
+    edges = [(u, v) for u, neighbours in enumerate(geo.neighbours) for v in neighbours if v > u]
+    return np.array([u for u, _ in edges]), np.array([v for _, v in edges])
 
 def h3_circuit_resistance(state, piece_type):
     board = state.get_rep()
-    env = board.get_env()
     dim = board.get_dimensions()[0]
+    geo = get_geometry(dim, dim)
+    grid = board.get_grid_array().ravel()
+    us, vs = _circuit_edges(dim)
     node_count = dim * dim + 2
     SOURCE = dim * dim
     SINK = dim * dim + 1
 
     def solve_resistance(ptype):
         R_PIECE, R_EMPTY, R_OPPONENT = 0.01, 1.0, 1e6
-        node_res = np.full(dim * dim, R_EMPTY)
-        for pos, piece in env.items():
-            r, c = pos
-            node_res[r * dim + c] = R_PIECE if piece.get_type() == ptype else R_OPPONENT
+        node_res = np.where(grid == 0, R_EMPTY, np.where(grid == GRID_CODES[ptype], R_PIECE, R_OPPONENT))
 
         L = np.zeros((node_count, node_count))
-        def add_edge(i, j, cond):
-            L[i, i] += cond; L[j, j] += cond; L[i, j] -= cond; L[j, i] -= cond
-
-        for r in range(dim):
-            for c in range(dim):
-                u = r * dim + c
-                for _, (_, (nr, nc)) in board.get_neighbours(r, c).items():
-                    v = nr * dim + nc
-                    if 0 <= nr < dim and 0 <= nc < dim and v > u:
-                        cond = 1.0 / ((node_res[u] + node_res[v]) / 2.0)
-                        add_edge(u, v, cond)
-
-        if ptype == "R":
-            for j in range(dim):
-                add_edge(SOURCE, j, 1.0 / (node_res[j] / 2.0))
-                add_edge((dim-1)*dim+j, SINK, 1.0 / (node_res[(dim-1)*dim+j] / 2.0))
-        else:
-            for i in range(dim):
-                add_edge(SOURCE, i*dim, 1.0 / (node_res[i*dim] / 2.0))
-                add_edge(i*dim+(dim-1), SINK, 1.0 / (node_res[i*dim+(dim-1)] / 2.0))
-
-        reduced_L = np.delete(np.delete(L, SINK, 0), SINK, 1)
+        diag = np.zeros(node_count)
+        cond = 1.0 / ((node_res[us] + node_res[vs]) / 2.0)
+        L[us, vs] = -cond; L[vs, us] = -cond
+        np.add.at(diag, us, cond); np.add.at(diag, vs, cond)
+
+        start, goal = (geo.top, geo.bottom) if ptype == "R" else (geo.left, geo.right)
+        for terminal, side in ((SOURCE, np.array(start)), (SINK, np.array(goal))):
+            cond = 1.0 / (node_res[side] / 2.0)
+            L[terminal, side] = -cond; L[side, terminal] = -cond
+            diag[side] += cond; diag[terminal] += cond.sum()
+        L[np.arange(node_count), np.arange(node_count)] = diag
+
+        reduced_L = L[:SINK, :SINK]
         I = np.zeros(node_count - 1); I[SOURCE] = 1.0
         try:
             phi = np.linalg.solve(reduced_L, I)
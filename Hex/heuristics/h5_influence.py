@@ -1,17 +1,24 @@
+from functools import lru_cache
+
 import numpy as np
+from board_hex import GRID_CODES
+from geometry_hex import get_geometry
+
+@lru_cache(maxsize=None)
+def _influence_weights(rows, cols):
+    """
+    Total influence a stone spreads from each cell: 1 on itself, 0.5 on each
+    neighbour and 0.2 on each neighbour of a neighbour, itself excluded.
+    """
+    geo = get_geometry(rows, cols)
+    weights = np.array([1 + 0.5 * len(neighbours) + 0.2 * sum(len(geo.neighbours[v]) - 1 for v in neighbours)
+                        for neighbours in geo.neighbours])
+    return weights.reshape(rows, cols)
 
 def h5_influence_map(state, my_piece):
     board = state.get_rep()
-    env = board.get_env()
     rows, cols = board.get_dimensions()
-    grid = np.zeros((rows, cols))
-    for (r, c), piece in env.items():
-        val = 10 if piece.get_type() == my_piece else -10
-        grid[r, c] += val
-        for _, (_, (nr, nc)) in board.get_neighbours(r, c).items():
-            if 0 <= nr < rows and 0 <= nc < cols:
-                grid[nr, nc] += (val * 0.5)
-                for _, (_, (nnr, nnc)) in board.get_neighbours(nr, nc).items():
-                    if 0 <= nnr < rows and 0 <= nnc < cols and (nnr, nnc) != (r, c):
-                        grid[nnr, nnc] += (val * 0.2)
-    return np.sum(grid)
+    grid = board.get_grid_array()
+    opp_piece = "B" if my_piece == "R" else "R"
+    signs = (grid == GRID_CODES[my_piece]).astype(np.int8) - (grid == GRID_CODES[opp_piece])
+    return 10 * np.sum(_influence_weights(rows, cols) * signs)
@@ -85,6 +85,8 @@ if __name__ == "__main__":
                         default=True, help="Headless mode\n\n")
     parser.add_argument("-r", "--record", action="store_true", default=False,
                         help="Stores the succesive game states in a json file.\n\n")
+    parser.add_argument("-c", "--compact", action="store_true", default=False,
+                        help="Sends the boards with their compact json encoding.\n\n")
     parser.add_argument("-l", "--log", required=False, choices=[
                         "DEBUG", "INFO"], default="INFO", help="\nSets the logging level.")
     parser.add_argument("players_list", nargs="*", help='The players')
@@ -98,6 +100,7 @@ if __name__ == "__main__":
     record = vars(args).get("record")
     log_level = vars(args).get("log")
     list_players = vars(args).get("players_list")
+    GameStateHex.compact_json = vars(args).get("compact")
 
     gui_path = os.path.join(
         dirname(os.path.abspath(__file__)), 'GUI', 'index.html')
@@ -0,0 +1,441 @@
+from __future__ import annotations
+import atexit
+import math
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from playout_hex import BatchPlayout, FillPlayout
+from search_state_hex import SearchStateHex
+
+OTHER_PIECE = {"R": "B", "B": "R"}
+
+# Seconds a worker of ParallelMCTS leaves to the pool to send the position
+# and bring the statistics back, and extra seconds waited for late workers.
+DISPATCH_MARGIN = 0.05
+COLLECT_GRACE = 0.25
+
+# Rows of the RAVE statistics of a node, indexed by cell: visits and wins of
+# the child playing the cell, and playouts in which the player to move owned
+# the cell at the end, with those it won.
+CHILD_VISITS, CHILD_WINS, AMAF_VISITS, AMAF_WINS = 0, 1, 2, 3
+
+
+class MCTSNode:
+    """
+    A node of the Monte-Carlo search tree.
+
+    Attributes:
+        move (int): cell index of the move leading to the node, -1 at the root
+        player (str): piece type of the player who played `move`
+        parent (MCTSNode | None): the parent node, None at the root
+        children (list[MCTSNode]): the expanded children
+        untried (list[int] | None): moves not expanded yet, in random order, None until the node is expanded
+        visits (int): number of playouts run through the node
+        wins (float): number of those playouts won by `player`
+        rave (np.ndarray | None): (4, rows*cols) int32 RAVE statistics indexed by cell, rows CHILD_VISITS,
+            CHILD_WINS, AMAF_VISITS and AMAF_WINS, None until the node is expanded or without RAVE
+    """
+
+    __slots__ = ("move", "player", "parent", "children", "untried", "visits", "wins", "rave")
+
+    def __init__(self, move: int, player: str, parent: MCTSNode | None, untried: list[int] | None = None) -> None:
+        self.move = move
+        self.player = player
+        self.parent = parent
+        self.children: list[MCTSNode] = []
+        self.untried = untried
+        self.visits = 0
+        self.wins = 0.0
+        self.rave: np.ndarray | None = None
+
+    def select_child(self, exploration: float) -> MCTSNode:
+        """
+        Returns the child maximising the UCT value
+        wins/visits + exploration*sqrt(ln(parent visits)/visits).
+
+        Args:
+            exploration (float): the UCT exploration constant
+
+        Returns:
+            MCTSNode: the selected child
+        """
+        log_visits = math.log(self.visits)
+        return max(self.children,
+                   key=lambda c: c.wins / c.visits + exploration * math.sqrt(log_visits / c.visits))
+
+    def select_child_rave(self, exploration: float, equivalence: float) -> MCTSNode:
+        """
+        Returns the child maximising the UCT value in which the win rate is
+        blended with the all-moves-as-first win rate of its cell,
+        (1-beta)*wins/visits + beta*amaf_wins/amaf_visits, with
+        beta = sqrt(equivalence/(3*visits + equivalence)). The AMAF estimate
+        dominates while the child has few visits of its own. The values of
+        all the cells are computed at once from the `rave` arrays.
+
+        Args:
+            exploration (float): the UCT exploration constant
+            equivalence (float): visits at which both estimates weigh about as much
+
+        Returns:
+            MCTSNode: the selected child
+        """
+        visits, wins, amaf_visits, amaf_wins = self.rave
+        expanded = visits > 0
+        child_visits = np.where(expanded, visits, 1)
+        beta = np.sqrt(equivalence / (3.0 * child_visits + equivalence))
+        amaf = (amaf_wins + 0.5) / (amaf_visits + 1.0)
+        values = (1 - beta) * (wins / child_visits) + beta * amaf
+        if exploration:
+            values += exploration * np.sqrt(math.log(self.visits) / child_visits)
+        move = int(np.where(expanded, values, -np.inf).argmax())
+        for child in self.children:
+            if child.move == move:
+                return child
+        raise ValueError(f"Cell {move} has visits but no child.")
+
+    def pop_untried_rave(self) -> int:
+        """
+        Removes and returns the untried move with the best all-moves-as-first
+        win rate, so that RAVE expands the promising cells first. Ties go to
+        the last of the moves, the one `pop` would take, so that the order of
+        `MCTS.order_moves` still decides while the AMAF values are equal.
+
+        Returns:
+            int: cell index of the move
+        """
+        moves = np.array(self.untried)
+        values = (self.rave[AMAF_WINS, moves] + 0.5) / (self.rave[AMAF_VISITS, moves] + 1.0)
+        position = len(values) - 1 - int(values[::-1].argmax())
+        return self.untried.pop(position)
+
+    def get_best_child(self) -> MCTSNode:
+        """
+        Returns the most visited child, the move to play.
+
+        Returns:
+            MCTSNode: the best child
+        """
+        return max(self.children, key=lambda c: c.visits)
+
+
+class MCTS:
+    """
+    UCT Monte-Carlo tree search over a SearchStateHex.
+
+    Every iteration walks down the tree with `play`, expands one move, runs a
+    fill-and-check random playout from the bitmasks of the board and takes
+    the moves back with `undo`, so the whole search works on a single board.
+
+    With `ordering_playouts`, a batch of playouts of the root position is run
+    first and the root expands its moves by decreasing frequency of the cell
+    being owned by the winner, so the critical cells get visits first.
+
+    With `rave_equivalence` > 0, every expanded node also keeps
+    all-moves-as-first statistics: a full Hex board has no move order, so a
+    playout counts as if the player to move at the node had played first
+    every cell it owns at the end. Selection blends them with the UCT value,
+    see `MCTSNode.select_child_rave`.
+
+    Attributes:
+        exploration (float): the UCT exploration constant
+        rng (random.Random): generator of the expansion order
+        seed (int | None): seed of the playout engines
+        ordering_playouts (int): batched playouts ordering the root moves, 0 to keep them in random order
+        rave_equivalence (float): RAVE equivalence parameter, 0 for plain UCT
+        playout_engine (FillPlayout | None): playout engine of the last board size searched
+        batch_engine (BatchPlayout | None): batched playout engine of the last board size searched
+        playouts (int): playouts of the tree run by the last search
+        batched_playouts (int): playouts of the root ordering run by the last search, not counted in `playouts`
+        elapsed (float): duration of the last search, in seconds
+    """
+
+    def __init__(self, exploration: float = 0.5, seed: int | None = None, ordering_playouts: int = 0,
+                 rave_equivalence: float = 0.0) -> None:
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.ordering_playouts = ordering_playouts
+        self.rave_equivalence = rave_equivalence
+        self.playout_engine: FillPlayout | None = None
+        self.batch_engine: BatchPlayout | None = None
+        self.playouts = 0
+        self.batched_playouts = 0
+        self.elapsed = 0.0
+
+    def search(self, state: SearchStateHex, time_budget: float, max_playouts: int | None = None) -> MCTSNode:
+        """
+        Grows a search tree from a position until the time budget or the
+        playout count is exhausted.
+
+        Args:
+            state (SearchStateHex): the position, left unchanged on return
+            time_budget (float): time allowed, in seconds
+            max_playouts (int | None): optional cap on the number of playouts of the tree
+
+        Returns:
+            MCTSNode: the root of the tree
+        """
+        start = time.perf_counter()
+        deadline = start + time_budget
+        rows, cols = state.dimensions
+        if self.playout_engine is None or (self.playout_engine.rows, self.playout_engine.cols) != (rows, cols):
+            self.playout_engine = FillPlayout(rows, cols, self.seed)
+        root = MCTSNode(-1, OTHER_PIECE[state.to_move], None)
+        self._expand(state, root)
+        playouts = self.batched_playouts = 0
+        if self.ordering_playouts and root.untried:
+            self.order_moves(state, root.untried)
+            self.batched_playouts = self.ordering_playouts
+        while max_playouts is None or playouts < max_playouts:
+            self._iterate(state, root)
+            playouts += 1
+            if time.perf_counter() >= deadline:
+                break
+        self.playouts = playouts
+        self.elapsed = time.perf_counter() - start
+        return root
+
+    def get_playout_rate(self) -> float:
+        """
+        Returns the playouts of the tree per second of the last search.
+
+        Returns:
+            float: playouts per second
+        """
+        return self.playouts / self.elapsed if self.elapsed > 0 else 0.0
+
+    def order_moves(self, state: SearchStateHex, moves: list[int]) -> None:
+        """
+        Sorts moves in place by increasing frequency of their cell being owned
+        by the winner of a batch of random playouts, so that `pop` takes the
+        most critical cell first.
+
+        Args:
+            state (SearchStateHex): the position, left unchanged
+            moves (list[int]): cell indices of the moves to sort
+        """
+        rows, cols = state.dimensions
+        if self.batch_engine is None or (self.batch_engine.rows, self.batch_engine.cols) != (rows, cols):
+            self.batch_engine = BatchPlayout(rows, cols, self.seed)
+        _, ownership = self.batch_engine.get_ownership(state.masks["R"], state.masks["B"], state.to_move,
+                                                       self.ordering_playouts)
+        ownership = ownership.ravel()
+        moves.sort(key=lambda move: ownership[move])
+
+    def _untried_moves(self, state: SearchStateHex) -> list[int]:
+        if state.winner() is not None:
+            return []
+        moves = state.get_empty_indices()
+        self.rng.shuffle(moves)
+        return moves
+
+    def _expand(self, state: SearchStateHex, node: MCTSNode) -> None:
+        node.untried = self._untried_moves(state)
+        if self.rave_equivalence > 0:
+            node.rave = np.zeros((4, len(state.cells)), dtype=np.int32)
+
+    def _iterate(self, state: SearchStateHex, root: MCTSNode) -> None:
+        rave = self.rave_equivalence > 0
+        node = root
+        depth = 0
+        while not node.untried and node.children:
+            if rave:
+                node = node.select_child_rave(self.exploration, self.rave_equivalence)
+            else:
+                node = node.select_child(self.exploration)
+            state.play(node.move)
+            depth += 1
+        if node.untried is None:
+            self._expand(state, node)
+        if node.untried:
+            move = node.pop_untried_rave() if rave else node.untried.pop()
+            player = state.to_move
+            state.play(move)
+            depth += 1
+            child = MCTSNode(move, player, node)
+            node.children.append(child)
+            node = child
+        winner = state.winner()
+        if winner is None:
+            winner, red = self.playout_engine.run(state.masks["R"], state.masks["B"], state.to_move)
+        else:
+            red = state.masks["R"]
+        if rave:
+            owned = {"R": self.playout_engine.to_array(red)}
+            owned["B"] = ~owned["R"]
+        child = None
+        while node is not None:
+            node.visits += 1
+            if node.player == winner:
+                node.wins += 1
+            if node.rave is not None:
+                # The children of the node are moves of the other player.
+                mover = OTHER_PIECE[node.player]
+                won = mover == winner
+                node.rave[AMAF_VISITS] += owned[mover]
+                if won:
+                    node.rave[AMAF_WINS] += owned[mover]
+                if child is not None:
+                    node.rave[CHILD_VISITS, child.move] += 1
+                    node.rave[CHILD_WINS, child.move] += won
+            child, node = node, node.parent
+        for _ in range(depth):
+            state.undo()
+
+    def playout(self, state: SearchStateHex) -> str:
+        """
+        Runs a random playout of the position to a full board.
+
+        Args:
+            state (SearchStateHex): the position, left unchanged
+
+        Returns:
+            str: piece type of the winner
+        """
+        winner, _ = self.playout_engine.run(state.masks["R"], state.masks["B"], state.to_move)
+        return winner
+
+
+# Search engine of a ParallelMCTS worker process, kept between moves.
+_worker_mcts: MCTS | None = None
+
+
+def _search_worker(rows: int, cols: int, cells: list[str | None], to_move: str, time_budget: float,
+                   exploration: float, seed: int | None, ordering_playouts: int,
+                   rave_equivalence: float) -> tuple[dict[int, tuple[int, float]], int]:
+    global _worker_mcts
+    if _worker_mcts is None or _worker_mcts.seed != seed:
+        _worker_mcts = MCTS(exploration, seed, ordering_playouts, rave_equivalence)
+    state = SearchStateHex.from_cells(rows, cols, cells, to_move)
+    root = _worker_mcts.search(state, time_budget)
+    return {child.move: (child.visits, child.wins) for child in root.children}, _worker_mcts.playouts
+
+
+class ParallelMCTS:
+    """
+    Root-parallel UCT: every worker process grows its own tree from the same
+    position with its own seed, and the visits and wins of the root moves are
+    summed before choosing the move.
+
+    Python runs one thread at a time, so the workers are processes of a
+    ProcessPoolExecutor, started on the first search and kept for the whole
+    game. The players of `-t local` also get the pool: ContaineredPlayerProxy
+    starts each of them in a process spawned by aiomultiprocess, which is
+    the main process of its own interpreter and not a daemon. `can_fork`
+    still checks the daemon flag as a safeguard, since a daemon process may
+    not have children: the search then falls back to a single MCTS in the
+    calling process.
+
+    Attributes:
+        workers (int): number of worker processes
+        exploration (float): the UCT exploration constant
+        seed (int | None): seed of the first worker, the others use seed+1, seed+2...
+        ordering_playouts (int): batched playouts ordering the root moves of each worker
+        rave_equivalence (float): RAVE equivalence parameter of each worker, 0 for plain UCT
+        fallback (MCTS): search run in the calling process when no pool is available
+        executor (ProcessPoolExecutor | None): the worker pool, None until the first search
+        parallel (bool): whether the last search ran in the worker pool
+        playouts (int): playouts run by the last search, summed over the workers
+        elapsed (float): duration of the last search, in seconds
+    """
+
+    def __init__(self, workers: int, exploration: float = 0.5, seed: int | None = None,
+                 ordering_playouts: int = 0, rave_equivalence: float = 0.0) -> None:
+        self.workers = workers
+        self.exploration = exploration
+        self.seed = seed
+        self.ordering_playouts = ordering_playouts
+        self.rave_equivalence = rave_equivalence
+        self.fallback = MCTS(exploration, seed, ordering_playouts, rave_equivalence)
+        self.executor: ProcessPoolExecutor | None = None
+        self.parallel = False
+        self.playouts = 0
+        self.elapsed = 0.0
+
+    def can_fork(self) -> bool:
+        """
+        Tells whether the calling process may start the worker pool.
+
+        Returns:
+            bool: False in a daemon process or with a single worker
+        """
+        return self.workers > 1 and not multiprocessing.current_process().daemon
+
+    def search(self, state: SearchStateHex, time_budget: float) -> MCTSNode:
+        """
+        Runs one search per worker on a position and merges their root moves.
+
+        Args:
+            state (SearchStateHex): the position, left unchanged on return
+            time_budget (float): time allowed, in seconds, pool overhead included
+
+        Returns:
+            MCTSNode: a root whose children hold the summed statistics of the
+                workers, with no grandchildren
+        """
+        start = time.perf_counter()
+        self.parallel = self.can_fork()
+        if self.parallel:
+            try:
+                root = self._search_pool(state, time_budget, start)
+            except BrokenProcessPool:
+                self.close()
+                self.parallel = False
+        if not self.parallel:
+            root = self.fallback.search(state, max(0.0, time_budget - (time.perf_counter() - start)))
+            self.playouts = self.fallback.playouts
+        self.elapsed = time.perf_counter() - start
+        return root
+
+    def _search_pool(self, state: SearchStateHex, time_budget: float, start: float) -> MCTSNode:
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.workers)
+            atexit.register(self.close)
+        rows, cols = state.dimensions
+        budget = max(0.01, time_budget - DISPATCH_MARGIN)
+        futures = [self.executor.submit(_search_worker, rows, cols, list(state.cells), state.to_move, budget,
+                                        self.exploration, None if self.seed is None else self.seed + worker,
+                                        self.ordering_playouts, self.rave_equivalence)
+                   for worker in range(self.workers)]
+        done, _ = wait(futures, timeout=max(0.0, time_budget + COLLECT_GRACE - (time.perf_counter() - start)))
+        root = MCTSNode(-1, OTHER_PIECE[state.to_move], None, [])
+        children: dict[int, MCTSNode] = {}
+        self.playouts = 0
+        for future in done:
+            moves, playouts = future.result()
+            self.playouts += playouts
+            for move, (visits, wins) in moves.items():
+                child = children.get(move)
+                if child is None:
+                    child = children[move] = MCTSNode(move, state.to_move, root, [])
+                    root.children.append(child)
+                child.visits += visits
+                child.wins += wins
+        root.visits = sum(child.visits for child in root.children)
+        if not root.children:
+            # No worker answered in time, the pool is not worth waiting for.
+            self.close()
+            self.parallel = False
+        return root
+
+    def get_playout_rate(self) -> float:
+        """
+        Returns the playouts per second of the last search, over all workers.
+
+        Returns:
+            float: playouts per second
+        """
+        return self.playouts / self.elapsed if self.elapsed > 0 else 0.0
+
+    def close(self) -> None:
+        """
+        Shuts the worker pool down, without waiting for running searches.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
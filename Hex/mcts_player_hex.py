@@ -0,0 +1,97 @@
+from loguru import logger
+
+from player_hex import PlayerHex
+from game_state_hex import GameStateHex
+from mcts_hex import MCTS, ParallelMCTS
+from search_state_hex import SearchStateHex
+from time_manager_hex import TimeManager
+from seahorse.game.action import Action
+from seahorse.game.stateless_action import StatelessAction
+
+
+class MyPlayer(PlayerHex):
+    """
+    Player class for Hex game that plays the most visited move of a UCT
+    Monte-Carlo tree search with RAVE, optionally root-parallel over several
+    processes.
+
+    Attributes:
+        piece_type (str): piece type of the player
+        mcts (MCTS | ParallelMCTS): the search engine
+        max_time_per_move (float): upper bound of the time spent on a move, in seconds
+        clock (TimeManager): allocation of the time of the moves
+        last_stats (dict): playouts, duration, playouts per second and processes used for the last move
+    """
+
+    def __init__(self, piece_type: str, name: str = "MCTSPlayer", *args,
+                 exploration: float | None = None, max_time_per_move: float = 10.0, seed: int | None = None,
+                 ordering_playouts: int = 2048, workers: int = 1, rave_equivalence: float = 300.0) -> None:
+        """
+        Initialize the PlayerHex instance.
+
+        Args:
+            piece_type (str): Type of the player's game piece "R" or "B"
+            name (str, optional): Name of the player (default is "MCTSPlayer")
+            exploration (float | None, optional): UCT exploration constant, 0 with RAVE and 0.5 without by default
+            max_time_per_move (float, optional): upper bound of the time spent on a move, in seconds
+            seed (int | None, optional): seed of the playouts, for reproducible games
+            ordering_playouts (int, optional): batched playouts ordering the root moves, 0 to disable
+            workers (int, optional): number of processes searching in parallel, 1 to search in the calling process
+            rave_equivalence (float, optional): RAVE equivalence parameter, 0 for plain UCT
+        """
+        super().__init__(piece_type, name, *args)
+        if exploration is None:
+            exploration = 0.0 if rave_equivalence > 0 else 0.5
+        if workers > 1:
+            self.mcts = ParallelMCTS(workers, exploration, seed, ordering_playouts, rave_equivalence)
+        else:
+            self.mcts = MCTS(exploration, seed, ordering_playouts, rave_equivalence)
+        self.max_time_per_move = max_time_per_move
+        self.clock = TimeManager(max_time=max_time_per_move)
+        self.last_stats = {}
+
+    def allocate_time(self, remaining_time: float, empty_count: int) -> float:
+        """
+        Splits the remaining time over the moves still to play, assuming the
+        game uses up to half of the empty cells for each player, minus the
+        reserve of the TimeManager.
+
+        Args:
+            remaining_time (float): time left for the whole game, in seconds
+            empty_count (int): number of empty cells
+
+        Returns:
+            float: time allowed for this move, in seconds
+        """
+        return self.clock.allocate(remaining_time, empty_count)
+
+    def compute_action(self, current_state: GameStateHex, remaining_time: float = 15*60, **kwargs) -> Action:
+        """
+        Function to implement the logic of the player (here Monte-Carlo tree search).
+
+        Args:
+            current_state (GameState): Current game state representation
+            remaining_time (float): Time left for the whole game, in seconds
+            **kwargs: Additional keyword arguments
+
+        Returns:
+            Action: The most visited move of the search
+        """
+        state = SearchStateHex.from_game_state(current_state)
+        if self.clock.is_panic(remaining_time):
+            # No time left to search: the empty cell closest to the centre
+            rows, cols = state.dimensions
+            move = min(state.get_empty_indices(),
+                       key=lambda index: (index // cols - rows // 2) ** 2 + (index % cols - cols // 2) ** 2)
+            return StatelessAction({"piece": self.piece_type, "position": state.geometry.coords[move]})
+        budget = self.allocate_time(remaining_time, state.get_empty_count())
+        root = self.mcts.search(state, budget)
+        best = root.get_best_child()
+        position = state.geometry.coords[best.move]
+        workers = self.mcts.workers if getattr(self.mcts, "parallel", False) else 1
+        self.last_stats = {"playouts": self.mcts.playouts, "elapsed": self.mcts.elapsed,
+                           "playouts_per_second": self.mcts.get_playout_rate(), "workers": workers}
+        logger.info(f"{self.get_name()}: {self.mcts.playouts} playouts in {self.mcts.elapsed:.2f}s "
+                    f"({self.mcts.get_playout_rate():.0f} playouts/s, {workers} process(es)), "
+                    f"plays {position} won {best.wins / best.visits:.0%} of {best.visits}")
+        return StatelessAction({"piece": self.piece_type, "position": position})
@@ -43,11 +43,8 @@ class MyPlayer(PlayerHex):
         if self.use_move_ordering and depth == self.depth:
             crit_map = get_criticality_map(state)
             def score_move(a):
-                curr = state.get_rep().get_env()
-                nxt = a.get_next_game_state().get_rep().get_env()
-                for p in nxt:
-                    if p not in curr: return crit_map.get(p, 0)
-                return 0
+                position, _ = a.get_move()
+                return crit_map.get(position, 0)
             actions.sort(key=score_move, reverse=True)
 
         best_action = None
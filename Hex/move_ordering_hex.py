@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import numpy as np
+
+from seahorse.game.action import Action
+
+NO_CELL = -1
+
+# Killer slots kept for every distance to the root.
+KILLER_SLOTS = 2
+
+# History scores are halved when one of them reaches this value, so that
+# they stay comparable with the new cutoffs.
+HISTORY_MAX = 1 << 24
+
+
+class MoveOrdering:
+    """
+    Move ordering of an alpha-beta search, from flat integer arrays indexed
+    by cell index i*cols+j.
+
+    The moves of a node are sorted by, in this order:
+
+    - the move of the transposition table entry of the node,
+    - the killer moves of the node's distance to the root: the last two
+      distinct moves that caused a beta cutoff at that ply, newest first,
+    - the history score of the cell, raised by depth*depth on every cutoff,
+    - a static prior of the cell, such as its closeness to the centre.
+
+    Any alpha-beta search plugs it in with `order` and `record_cutoff`,
+    PVSearch through its `move_ordering` argument. Between two moves of the
+    game, `new_search` halves the history and shifts the killers by the
+    plies played since, so that they stay keyed by distance to the root.
+
+    Attributes:
+        rows (int): number of lines of the board
+        cols (int): number of columns of the board
+        max_ply (int): number of plies with killer slots, deeper cutoffs are not recorded
+        killers (np.ndarray): (max_ply, KILLER_SLOTS) int32 array, cell indices, NO_CELL when empty
+        history (np.ndarray): (rows*cols,) int64 array, history score of every cell
+        prior (np.ndarray): (rows*cols,) int64 array, static score of every cell, higher first
+    """
+
+    def __init__(self, rows: int, cols: int, max_ply: int = 64, prior: np.ndarray | None = None) -> None:
+        self.rows = rows
+        self.cols = cols
+        self.max_ply = max_ply
+        self.killers = np.full((max_ply, KILLER_SLOTS), NO_CELL, dtype=np.int32)
+        self.history = np.zeros(rows * cols, dtype=np.int64)
+        self.prior = np.zeros(rows * cols, dtype=np.int64) if prior is None else np.asarray(prior, dtype=np.int64)
+
+    @classmethod
+    def centred(cls, rows: int, cols: int, max_ply: int = 64) -> MoveOrdering:
+        """
+        Builds an ordering whose prior favours the cells close to the centre,
+        as the archive players did.
+
+        Args:
+            rows (int): number of lines of the board
+            cols (int): number of columns of the board
+            max_ply (int): number of plies with killer slots
+
+        Returns:
+            MoveOrdering: the ordering, with minus the squared distance to the centre as prior
+        """
+        i, j = np.divmod(np.arange(rows * cols), cols)
+        return cls(rows, cols, max_ply, -((i - rows // 2) ** 2 + (j - cols // 2) ** 2))
+
+    def order(self, actions: list[Action], ply: int, tt_move: tuple[int, int] | None = None) -> list[Action]:
+        """
+        Sorts the moves of a node, best first.
+
+        Args:
+            actions (list[Action]): the moves, whose get_move() gives the cell
+            ply (int): distance of the node to the root
+            tt_move (tuple[int, int] | None): move of the transposition table entry of the node
+
+        Returns:
+            list[Action]: the moves, sorted
+        """
+        cols = self.cols
+        cells = np.fromiter((i * cols + j for (i, j), _ in (action.get_move() for action in actions)),
+                            dtype=np.int64, count=len(actions))
+        killer_rank = np.zeros(len(cells), dtype=np.int64)
+        if ply < self.max_ply:
+            for slot, killer in enumerate(self.killers[ply].tolist()):
+                if killer != NO_CELL:
+                    killer_rank[cells == killer] = KILLER_SLOTS - slot
+        if tt_move is None:
+            is_tt_move = np.zeros(len(cells), dtype=bool)
+        else:
+            is_tt_move = cells == tt_move[0] * cols + tt_move[1]
+        # lexsort sorts by the last key first, and in increasing order
+        order = np.lexsort((-self.prior[cells], -self.history[cells], -killer_rank, ~is_tt_move))
+        return [actions[index] for index in order.tolist()]
+
+    def record_cutoff(self, position: tuple[int, int], depth: int, ply: int) -> None:
+        """
+        Records a move that caused a beta cutoff.
+
+        Args:
+            position (tuple[int, int]): the cell of the move
+            depth (int): remaining depth of the node
+            ply (int): distance of the node to the root
+        """
+        cell = position[0] * self.cols + position[1]
+        self.history[cell] += depth * depth
+        if self.history[cell] >= HISTORY_MAX:
+            self.history >>= 1
+        if ply < self.max_ply and self.killers[ply, 0] != cell:
+            self.killers[ply, 1:] = self.killers[ply, :-1]
+            self.killers[ply, 0] = cell
+
+    def new_search(self, plies: int | None) -> None:
+        """
+        Ages the tables before searching a new root.
+
+        Args:
+            plies (int | None): moves played since the root of the previous search, None if unknown
+        """
+        self.history >>= 1
+        if plies is None or plies < 0 or plies >= self.max_ply:
+            self.killers[:] = NO_CELL
+        elif plies:
+            self.killers[:-plies] = self.killers[plies:]
+            self.killers[-plies:] = NO_CELL
+
+    def clear(self) -> None:
+        """
+        Empties the killers and the history.
+        """
+        self.killers[:] = NO_CELL
+        self.history[:] = 0
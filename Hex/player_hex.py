@@ -44,7 +44,8 @@ class PlayerHex(Player):
         self.piece_type = piece_type
     
     def to_json(self) -> dict:
-        return {i:j for i,j in self.__dict__.items() if not i.startswith("_")}
+        # Only what from_json reads back: the search engines of the subclasses are not JSON
+        return {i:j for i,j in self.__dict__.items() if i in ("name", "id", "piece_type")}
 
     @classmethod
     def from_json(cls, data) -> PlayerHex:
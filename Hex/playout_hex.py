@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import numpy as np
+
+from geometry_hex import get_geometry
+
+
+class FillPlayout:
+    """
+    Fill-and-check random playouts of an Hex position over bitmasks.
+
+    A full Hex board always has exactly one winner, so a random playout does
+    not need to check for a win after every move: the empty cells are dealt
+    at random, half to each player starting with the player to move, and a
+    single flood fill on the full board tells whether red connects its sides.
+
+    Cell (i,j) is bit i*cols+j of the masks, as in SearchStateHex. The flood fill
+    dilates the whole red group at once with six shifted copies of the mask.
+
+    Attributes:
+        rows (int): number of lines of the board
+        cols (int): number of columns of the board
+        full (int): bitmask of every cell
+        rng (np.random.Generator): generator dealing the empty cells
+    """
+
+    def __init__(self, rows: int, cols: int, seed: int | None = None) -> None:
+        self.rows = rows
+        self.cols = cols
+        self.size = rows * cols
+        geometry = get_geometry(rows, cols)
+        self.full = (1 << self.size) - 1
+        self.top_mask, self.bottom_mask = geometry.top_mask, geometry.bottom_mask
+        # Shifting a mask by one column moves the last column onto the first
+        # one of the next line and back, these masks clear the wrapped bits.
+        self.not_first_col = self.full & ~geometry.left_mask
+        self.not_last_col = self.full & ~geometry.right_mask
+        self.nbytes = (self.size + 7) // 8
+        self.rng = np.random.default_rng(seed)
+
+    def get_masks(self, cells: list[str | None]) -> tuple[int, int]:
+        """
+        Builds the red and blue bitmasks of a flat cell list.
+
+        Args:
+            cells (list[str | None]): piece type of every cell, indexed by i*cols+j
+
+        Returns:
+            tuple[int, int]: the red and blue bitmasks
+        """
+        red = blue = 0
+        for index, piece_type in enumerate(cells):
+            if piece_type == "R":
+                red |= 1 << index
+            elif piece_type == "B":
+                blue |= 1 << index
+        return red, blue
+
+    def to_array(self, mask: int) -> np.ndarray:
+        """
+        Unpacks a bitmask into a flat bool array.
+
+        Args:
+            mask (int): the bitmask, bit i*cols+j for cell (i,j)
+
+        Returns:
+            np.ndarray: (rows*cols,) bool array, True on the cells of the mask
+        """
+        return np.unpackbits(np.frombuffer(mask.to_bytes(self.nbytes, "little"), dtype=np.uint8),
+                             bitorder="little")[:self.size].view(bool)
+
+    def red_connects(self, red: int) -> bool:
+        """
+        Checks whether red stones connect the top and the bottom of the board.
+
+        Args:
+            red (int): bitmask of the red stones
+
+        Returns:
+            bool: True if red connects its sides
+        """
+        reached = red & self.top_mask
+        if not red & self.bottom_mask:
+            return False
+        cols, not_first, not_last = self.cols, self.not_first_col, self.not_last_col
+        while reached:
+            if reached & self.bottom_mask:
+                return True
+            grown = (reached | (reached << 1) & not_first | (reached >> 1) & not_last
+                     | reached << cols | reached >> cols
+                     | (reached >> (cols - 1)) & not_first | (reached << (cols - 1)) & not_last) & red
+            if grown == reached:
+                return False
+            reached = grown
+        return False
+
+    def deal(self, empty: int, count: int) -> int:
+        """
+        Picks uniformly at random `count` cells among the empty cells.
+
+        Args:
+            empty (int): bitmask of the empty cells
+            count (int): number of cells to pick
+
+        Returns:
+            int: bitmask of the picked cells
+        """
+        bits = np.unpackbits(np.frombuffer(empty.to_bytes(self.nbytes, "little"), dtype=np.uint8),
+                             bitorder="little")[:self.size]
+        cells = np.flatnonzero(bits)
+        bits[:] = 0
+        bits[self.rng.permutation(cells)[:count]] = 1
+        return int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+
+    def run(self, red: int, blue: int, to_move: str) -> tuple[str, int]:
+        """
+        Runs one random playout of a position.
+
+        Args:
+            red (int): bitmask of the red stones
+            blue (int): bitmask of the blue stones
+            to_move (str): piece type of the player to move
+
+        Returns:
+            tuple[str, int]: the winner, "R" or "B", and the bitmask of the
+                cells owned by red on the full board, blue owning the others
+        """
+        empty = self.full & ~(red | blue)
+        count = empty.bit_count()
+        if count:
+            mover = self.deal(empty, (count + 1) // 2)
+            red |= mover if to_move == "R" else empty & ~mover
+        return ("R" if self.red_connects(red) else "B"), red
+
+
+# Dilation steps of the batched flood fill between two removals of the
+# boards already decided.
+COMPACTION_STEPS = 4
+
+
+class BatchPlayout:
+    """
+    Fill-and-check random playouts of one position run on many boards at once
+    with NumPy.
+
+    Every board is stored as one unsigned integer per line, bit j of line i
+    being cell (i,j), so a batch is a (N, rows) uint64 array. The empty cells
+    are dealt to the players with one random key per cell, and the flood fill
+    of red from the top dilates every board of the batch at each step. Boards
+    whose flood reached the bottom or stopped growing are dropped from the
+    batch every few steps, so the last steps only work on the slow boards.
+
+    Attributes:
+        rows (int): number of lines of the board
+        cols (int): number of columns of the board, at most 64
+        rng (np.random.Generator): generator dealing the empty cells
+    """
+
+    def __init__(self, rows: int, cols: int, seed: int | None = None) -> None:
+        if cols > 64:
+            raise ValueError("BatchPlayout stores a line of the board in 64 bits.")
+        self.rows = rows
+        self.cols = cols
+        self.size = rows * cols
+        self.rng = np.random.default_rng(seed)
+        self.nbytes = (self.size + 7) // 8
+        self.column_bits = np.left_shift(np.uint64(1), np.arange(cols, dtype=np.uint64))
+
+    def _unpack(self, mask: int) -> np.ndarray:
+        return np.unpackbits(np.frombuffer(mask.to_bytes(self.nbytes, "little"), dtype=np.uint8),
+                             bitorder="little")[:self.size].astype(bool)
+
+    def deal(self, red: int, blue: int, to_move: str, count: int) -> np.ndarray:
+        """
+        Deals the empty cells of a position at random on `count` boards.
+
+        Args:
+            red (int): bitmask of the red stones, bit i*cols+j for cell (i,j)
+            blue (int): bitmask of the blue stones
+            to_move (str): piece type of the player to move
+            count (int): number of boards
+
+        Returns:
+            np.ndarray: (count, rows*cols) bool array, True where red owns the cell
+        """
+        empty = np.flatnonzero(~self._unpack(red | blue))
+        boards = np.broadcast_to(self._unpack(red), (count, self.size)).copy()
+        if len(empty):
+            keys = self.rng.random((count, len(empty)), dtype=np.float32)
+            mover_count = (len(empty) + 1) // 2
+            # The mover gets the cells of the mover_count smallest keys by rank, not by value:
+            # float32 keys can tie, and a threshold would then give it an extra cell
+            ranks = np.argpartition(keys, mover_count - 1, axis=1)[:, :mover_count]
+            mover = np.zeros(keys.shape, dtype=bool)
+            np.put_along_axis(mover, ranks, True, axis=1)
+            boards[:, empty] = mover if to_move == "R" else ~mover
+        return boards
+
+    def red_wins(self, boards: np.ndarray) -> np.ndarray:
+        """
+        Checks on every full board whether red connects the top and the bottom.
+
+        Args:
+            boards (np.ndarray): (N, rows*cols) bool array, True where red owns the cell
+
+        Returns:
+            np.ndarray: (N,) bool array, True where red wins
+        """
+        red = (boards.reshape(-1, self.rows, self.cols) * self.column_bits).sum(axis=2, dtype=np.uint64)
+        wins = np.zeros(len(red), dtype=bool)
+        active = np.arange(len(red))
+        reached = np.zeros_like(red)
+        reached[:, 0] = red[:, 0]
+        one = np.uint64(1)
+        while len(active):
+            for _ in range(COMPACTION_STEPS):
+                grown = reached | (reached << one) | (reached >> one)
+                # (i-1,j) and (i-1,j+1) are neighbours of (i,j), as are (i+1,j-1) and (i+1,j)
+                grown[:, 1:] |= reached[:, :-1] | (reached[:, :-1] >> one)
+                grown[:, :-1] |= reached[:, 1:] | (reached[:, 1:] << one)
+                grown &= red
+                reached, previous = grown, reached
+            won = reached[:, -1] != 0
+            wins[active[won]] = True
+            growing = ~won & (reached != previous).any(axis=1)
+            active, reached, red = active[growing], reached[growing], red[growing]
+        return wins
+
+    def run(self, red: int, blue: int, to_move: str, count: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Runs `count` random playouts of a position.
+
+        Args:
+            red (int): bitmask of the red stones, bit i*cols+j for cell (i,j)
+            blue (int): bitmask of the blue stones
+            to_move (str): piece type of the player to move
+            count (int): number of playouts
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (N,) bool array, True where red wins,
+                and (N, rows*cols) bool array, True where red owns the cell
+        """
+        boards = self.deal(red, blue, to_move, count)
+        return self.red_wins(boards), boards
+
+    def get_ownership(self, red: int, blue: int, to_move: str, count: int) -> tuple[float, np.ndarray]:
+        """
+        Estimates the red win rate of a position and, for every cell, how often
+        it belongs to the winner of the playout. Cells the winner almost always
+        owns are the critical ones, worth trying first.
+
+        Args:
+            red (int): bitmask of the red stones, bit i*cols+j for cell (i,j)
+            blue (int): bitmask of the blue stones
+            to_move (str): piece type of the player to move
+            count (int): number of playouts
+
+        Returns:
+            tuple[float, np.ndarray]: the red win rate and the (rows, cols)
+                frequency of each cell being owned by the winner
+        """
+        red_wins, boards = self.run(red, blue, to_move, count)
+        owned_by_winner = boards == red_wins[:, None]
+        return float(red_wins.mean()), owned_by_winner.mean(axis=0).reshape(self.rows, self.cols)
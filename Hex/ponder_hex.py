@@ -0,0 +1,123 @@
+from __future__ import annotations
+import threading
+
+from seahorse.game.action import Action
+
+from game_state_hex import GameStateHex
+from search_hex import INFINITY, PVSearch
+from stateful_action_hex import LazyStatefulAction
+
+# Seconds between two attempts to stop the pondering thread.
+STOP_POLL = 0.005
+
+
+class Ponderer:
+    """
+    Pondering: searches the position after the predicted reply of the
+    opponent while the opponent thinks.
+
+    `compute_action` returns as usual and the search goes on in a daemon
+    thread of the player process, which sits idle until the next request of
+    the player proxy: ContaineredPlayerProxy blocks on its queue and the
+    remote proxies on their socket, so the thread gets the processor. The
+    predicted reply is the second move of the principal variation of the
+    search just played.
+
+    The thread runs the PVSearch of the player, whose transposition table,
+    history and killers fill up with the next root. The pondering ages them
+    for that root, which has the step of the next turn, so the real search
+    of the turn does not age them again, even when it searches another
+    position. The next call to `compute_action` must `stop` it before
+    searching, and gets the result of the pondering back when the opponent
+    played the predicted reply.
+
+    Attributes:
+        search (PVSearch): search of the player, only used by the thread while it runs
+        max_depth (int): deepest iteration of the pondering
+        predicted (GameStateHex | None): root of the running pondering, None when idle
+        action (Action | None): best move of the deepest completed iteration of the pondering
+        score (float | None): score of that move
+        completed_depth (int): deepest iteration completed by the pondering
+        nodes (int): nodes visited by the pondering
+        hits (int): turns whose position was the one pondered
+        misses (int): turns whose position was another one
+    """
+
+    def __init__(self, search: PVSearch, max_depth: int = 9) -> None:
+        self.search = search
+        self.max_depth = max_depth
+        self.predicted: GameStateHex | None = None
+        self.action: Action | None = None
+        self.score: float | None = None
+        self.completed_depth = 0
+        self.nodes = 0
+        self.hits = self.misses = 0
+        self._thread: threading.Thread | None = None
+
+    def __getstate__(self) -> dict:
+        # A thread cannot be pickled, the player travels without it.
+        return {**self.__dict__, "_thread": None, "predicted": None}
+
+    def start(self, state: GameStateHex, action: Action) -> bool:
+        """
+        Starts pondering the predicted reply to a move.
+
+        Args:
+            state (GameStateHex): the position just searched
+            action (Action): the move played from it
+
+        Returns:
+            bool: whether a reply was predicted and the pondering started
+        """
+        self.stop()
+        pv = self.search.pv
+        position = action.get_move()[0]
+        if len(pv) < 2 or pv[0] != position:
+            return False
+        after = LazyStatefulAction(state, position, action.get_move()[1]).get_next_game_state()
+        if after.is_done():
+            return False
+        self.predicted = LazyStatefulAction(after, pv[1], after.get_active_player().get_piece_type()
+                                            ).get_next_game_state()
+        if self.predicted.is_done():
+            self.predicted = None
+            return False
+        self.action, self.score, self.completed_depth, self.nodes = None, None, 0, 0
+        self._thread = threading.Thread(target=self._run, args=(self.predicted,), daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self, root: GameStateHex) -> None:
+        self.action, self.score = self.search.iterative_deepening(root, INFINITY, self.max_depth)
+        self.completed_depth, self.nodes = self.search.completed_depth, self.search.nodes
+
+    def stop(self, state: GameStateHex | None = None) -> tuple[Action | None, int]:
+        """
+        Stops the pondering, and tells whether it searched a position.
+
+        Args:
+            state (GameStateHex | None): the position to play now, None to only stop
+
+        Returns:
+            tuple[Action | None, int]: best move in `state` of the deepest iteration completed by the
+                pondering and its depth, (None, 0) if the pondering searched another position
+        """
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            # The search is stopped again until the thread sees it: iterative_deepening
+            # lowers the flag when it starts.
+            while thread.is_alive():
+                self.search.stop()
+                thread.join(STOP_POLL)
+        predicted, self.predicted = self.predicted, None
+        if state is None or predicted is None:
+            return None, 0
+        if (state.get_zobrist() != predicted.get_zobrist()
+                or state.get_active_player().get_piece_type() != predicted.get_active_player().get_piece_type()):
+            self.misses += 1
+            return None, 0
+        self.hits += 1
+        if self.action is None:
+            return None, 0
+        position, piece_type = self.action.get_move()
+        return LazyStatefulAction(state, position, piece_type), self.completed_depth
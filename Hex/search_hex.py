@@ -0,0 +1,338 @@
+from __future__ import annotations
+import time
+from typing import Callable
+
+from seahorse.game.action import Action
+
+from game_state_hex import GameStateHex
+from move_ordering_hex import MoveOrdering
+from stateful_action_hex import LazyStatefulAction
+from symmetry_hex import get_canonical_key, get_symmetry_tables
+from time_manager_hex import TimeManager, Watchdog
+from transposition_hex import TranspositionTable
+
+# Bounds of the transposition table entries, as in the archive players.
+EXACT, LOWERBOUND, UPPERBOUND = "EXACT", "LOWERBOUND", "UPPERBOUND"
+
+INFINITY = float("inf")
+
+
+class PVSearch:
+    """
+    Iterative deepening Principal Variation Search over GameStateHex.
+
+    The search is a negamax: `evaluate` scores a position for the player to
+    move at the root, and the nodes of the other player negate it. On top of
+    plain alpha-beta it adds:
+
+    - PVS: the first move of a node is searched with the full window, the
+      others with a null window around alpha, and re-searched with the full
+      window only when they beat it.
+    - Aspiration windows: every iteration after the first starts with a
+      window of `aspiration_window` around the previous score, widened to
+      the full window on the side it fails.
+    - Late-move reductions: from depth `lmr_min_depth`, the moves after the
+      first `lmr_full_moves` are searched one ply shallower, and searched
+      again at full depth if they beat alpha anyway.
+
+    A Watchdog raises a flag at the deadline, that every node reads instead
+    of the clock, and TimeoutError interrupts the iteration, whose result is
+    dropped: `iterative_deepening` returns the move of the last completed
+    depth, as the archive players did. With a TimeManager, the deadline is
+    the soft limit of the move, which grows while the best move keeps
+    changing, and no iteration starts after half of it.
+
+    The moves of a node come from `order_moves`, then get sorted by the
+    MoveOrdering when there is one, by the transposition table move first
+    otherwise, and the move of the principal variation goes first.
+
+    The search keeps its state from one move to the next. The transposition
+    table moves to a new generation instead of being cleared, the
+    MoveOrdering ages its history and killers, and when the opponent
+    answered the expected move the principal variation is shifted by two
+    plies and searched first. The positions the previous search already
+    solved are then found in the table, and the first iterations of the new
+    search cost a few nodes.
+
+    Attributes:
+        evaluate (Callable[[GameStateHex], float]): score of a position for the root player
+        order_moves (Callable | None): order_moves(state, actions, depth, ply) returns the actions to search, best first
+        on_cutoff (Callable | None): on_cutoff(action, depth, ply) is called for every beta cutoff
+        move_ordering (MoveOrdering | None): killer, history and transposition table move ordering
+        transposition_table (TranspositionTable | dict | None): canonical Zobrist key -> (depth, score, flag,
+            canonical move), None to disable
+        aspiration_window (float): half width of the aspiration windows
+        null_window (float): width of the null windows, smaller than the smallest score difference
+        lmr_min_depth (int): smallest remaining depth at which late moves are reduced
+        lmr_full_moves (int): moves of a node searched at full depth before reducing the others
+        nodes (int): nodes visited by the last call of `iterative_deepening`
+        re_searches (int): null-window and reduced searches that had to be searched again
+        aspiration_fails (int): iterations whose aspiration window failed
+        completed_depth (int): last depth fully searched
+        watchdog (Watchdog): deadline flag of the running search
+        cutoffs (int): beta cutoffs of the last call of `iterative_deepening`
+        first_move_cutoffs (int): beta cutoffs caused by the first move of their node
+        pv (list[tuple[int, int]]): cells of the principal variation of the last completed iteration
+    """
+
+    def __init__(self, evaluate: Callable[[GameStateHex], float],
+                 order_moves: Callable[[GameStateHex, list, int, int], list] | None = None,
+                 on_cutoff: Callable[[Action, int, int], None] | None = None,
+                 transposition_table: TranspositionTable | dict | None = None, aspiration_window: float = 150.0,
+                 null_window: float = 1.0, lmr_min_depth: int = 3, lmr_full_moves: int = 3,
+                 move_ordering: MoveOrdering | None = None) -> None:
+        self.evaluate = evaluate
+        self.order_moves = order_moves
+        self.on_cutoff = on_cutoff
+        self.transposition_table = transposition_table
+        self.aspiration_window = aspiration_window
+        self.null_window = null_window
+        self.lmr_min_depth = lmr_min_depth
+        self.lmr_full_moves = lmr_full_moves
+        self.move_ordering = move_ordering
+        self.nodes = 0
+        self.re_searches = 0
+        self.aspiration_fails = 0
+        self.completed_depth = 0
+        self.cutoffs = self.first_move_cutoffs = 0
+        self.time_limit = INFINITY
+        self.watchdog = Watchdog()
+        self.pv: list[tuple[int, int]] = []
+        # Step of the root of the last search, to count the moves played since
+        self._root_step: int | None = None
+        # Principal variation found below every ply of the running iteration
+        self._lines: list[list[tuple[int, int]]] = []
+
+    def iterative_deepening(self, state: GameStateHex, time_limit: float, max_depth: int = 9,
+                            start_depth: int = 1, clock: TimeManager | None = None
+                            ) -> tuple[Action | None, float | None]:
+        """
+        Searches deeper and deeper until the deadline.
+
+        Args:
+            state (GameStateHex): the position, the root player is its active player
+            time_limit (float): deadline, in seconds since the epoch as given by time.time()
+            max_depth (int): deepest iteration
+            start_depth (int): first iteration
+            clock (TimeManager | None): time manager of the move, started by the caller, whose soft limit
+                comes before time_limit
+
+        Returns:
+            tuple[Action | None, float | None]: best move and score of the last completed depth,
+                (None, None) if not even depth 1 completed
+        """
+        self.time_limit = time_limit
+        self.nodes = self.re_searches = self.aspiration_fails = self.completed_depth = 0
+        self.cutoffs = self.first_move_cutoffs = 0
+        self.new_search(state)
+        self.watchdog.arm(time_limit if clock is None else min(time_limit, clock.get_deadline()))
+        best_action, best_score = None, None
+        try:
+            for depth in range(start_depth, max_depth + 1):
+                if time.time() > time_limit or (best_action is not None and clock is not None
+                                                and not clock.should_deepen()):
+                    break
+                score, action = self.aspiration_search(state, depth, best_score)
+                if action is not None:
+                    best_action, best_score = action, score
+                    self.pv = self._lines[0] if self._lines and self._lines[0] else [action.get_move()[0]]
+                    if clock is not None:
+                        clock.record_iteration(action.get_move()[0])
+                        self.watchdog.arm(min(time_limit, clock.get_deadline()))
+                self.completed_depth = depth
+        except TimeoutError:
+            pass
+        finally:
+            self.watchdog.cancel()
+        return best_action, best_score
+
+    def stop(self) -> None:
+        """
+        Interrupts the running search, from another thread.
+        """
+        self.watchdog.expire()
+
+    def new_search(self, state: GameStateHex) -> None:
+        """
+        Ages the state kept from the previous search before searching a new
+        root: next generation of the transposition table, history and
+        killers aged by the MoveOrdering, principal variation shifted by the
+        two moves played since, or dropped if the game left it.
+
+        The tables only age once per move of the game. A root at the same
+        step as the previous one continues that search: the real search of a
+        turn reuses, still current, what the pondering of that turn stored.
+
+        Args:
+            state (GameStateHex): the new root
+        """
+        step = state.get_step()
+        if step != self._root_step:
+            if hasattr(self.transposition_table, "new_search"):
+                self.transposition_table.new_search()
+            if self.move_ordering is not None:
+                self.move_ordering.new_search(None if self._root_step is None else step - self._root_step)
+        self._root_step = step
+        env = state.get_rep().get_env()
+        last_move = state.get_last_move()
+        if len(self.pv) > 2 and self.pv[0] in env and last_move is not None and last_move[0] == self.pv[1]:
+            self.pv = self.pv[2:]
+        elif not self.pv or self.pv[0] in env:
+            self.pv = []
+
+    def get_first_move_cutoff_rate(self) -> float:
+        """
+        Returns the share of the beta cutoffs of the last search caused by
+        the first move of their node, the usual measure of move ordering.
+
+        Returns:
+            float: first_move_cutoffs / cutoffs, 0 without cutoffs
+        """
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def aspiration_search(self, state: GameStateHex, depth: int,
+                          guess: float | None) -> tuple[float, Action | None]:
+        """
+        Searches the root at a fixed depth in a window around a guess,
+        widening it until the score falls inside.
+
+        Args:
+            state (GameStateHex): the root position
+            depth (int): depth of the search
+            guess (float | None): score of the previous iteration, None for the full window
+
+        Returns:
+            tuple[float, Action | None]: the score and the best move
+        """
+        if guess is None or abs(guess) == INFINITY:
+            return self.pvs(state, depth, -INFINITY, INFINITY, 1, 0, on_pv=True)
+        alpha, beta = guess - self.aspiration_window, guess + self.aspiration_window
+        while True:
+            score, action = self.pvs(state, depth, alpha, beta, 1, 0, on_pv=True)
+            if score <= alpha:
+                alpha = -INFINITY
+            elif score >= beta:
+                beta = INFINITY
+            else:
+                return score, action
+            self.aspiration_fails += 1
+
+    def pvs(self, state: GameStateHex, depth: int, alpha: float, beta: float,
+            color: int, ply: int, on_pv: bool = False) -> tuple[float, Action | None]:
+        """
+        Negamax Principal Variation Search of a node.
+
+        Args:
+            state (GameStateHex): the position
+            depth (int): remaining depth
+            alpha (float): lower bound of the window, for the player to move
+            beta (float): upper bound of the window, for the player to move
+            color (int): 1 if the root player is to move, -1 otherwise
+            ply (int): distance to the root
+            on_pv (bool): whether the moves from the root follow the principal variation
+
+        Raises:
+            TimeoutError: once the deadline is over
+
+        Returns:
+            tuple[float, Action | None]: the score for the player to move and the best move
+        """
+        if self.watchdog.expired:
+            raise TimeoutError()
+        self.nodes += 1
+        original_alpha = alpha
+        del self._lines[ply:]
+        self._lines.append([])
+
+        board_hash = transform = tt_action = None
+        if self.transposition_table is not None:
+            board_hash, transform = get_canonical_key(state, colour_swaps=False)
+            entry = self.transposition_table.get(board_hash)
+            if entry is not None:
+                tt_depth, tt_score, tt_flag, tt_move = entry
+                tt_action = self._tt_action(state, tt_move, transform)
+                # The root is searched anyway, to rebuild its principal variation.
+                if tt_depth >= depth and ply > 0:
+                    if tt_action is not None:
+                        self._lines[ply] = [tt_action.get_move()[0]]
+                    if tt_flag == EXACT:
+                        return tt_score, tt_action
+                    if tt_flag == LOWERBOUND:
+                        alpha = max(alpha, tt_score)
+                    elif tt_flag == UPPERBOUND:
+                        beta = min(beta, tt_score)
+                    if alpha >= beta:
+                        return tt_score, tt_action
+
+        if depth <= 0 or state.is_done():
+            score = color * self.evaluate(state)
+            if board_hash is not None:
+                self.transposition_table[board_hash] = (depth, score, EXACT, None)
+            return score, None
+
+        actions = list(state.generate_possible_stateful_actions())
+        if not actions:
+            return color * self.evaluate(state), None
+        if self.order_moves is not None:
+            actions = self.order_moves(state, actions, depth, ply)
+        if self.move_ordering is not None:
+            actions = self.move_ordering.order(actions, ply, None if tt_action is None else tt_action.get_move()[0])
+        elif tt_action is not None:
+            tt_move = tt_action.get_move()[0]
+            actions.sort(key=lambda action: action.get_move()[0] != tt_move)
+        pv_move = self.pv[ply] if on_pv and ply < len(self.pv) else None
+        if pv_move is not None:
+            actions.sort(key=lambda action: action.get_move()[0] != pv_move)
+
+        best_score, best_action = -INFINITY, actions[0]
+        for index, action in enumerate(actions):
+            next_state = action.get_next_game_state()
+            if index == 0:
+                follows_pv = pv_move is not None and action.get_move()[0] == pv_move
+                score = -self.pvs(next_state, depth - 1, -beta, -alpha, -color, ply + 1, follows_pv)[0]
+            else:
+                reduction = int(depth >= self.lmr_min_depth and index >= self.lmr_full_moves
+                                and not next_state.is_done())
+                score = -self.pvs(next_state, depth - 1 - reduction, -alpha - self.null_window, -alpha,
+                                  -color, ply + 1)[0]
+                if score > alpha and reduction:
+                    self.re_searches += 1
+                    score = -self.pvs(next_state, depth - 1, -alpha - self.null_window, -alpha,
+                                      -color, ply + 1)[0]
+                if alpha < score < beta:
+                    self.re_searches += 1
+                    score = -self.pvs(next_state, depth - 1, -beta, -score, -color, ply + 1)[0]
+            if score > best_score:
+                best_score, best_action = score, action
+                if score > alpha:
+                    child_line = self._lines[ply + 1] if len(self._lines) > ply + 1 else []
+                    self._lines[ply] = [action.get_move()[0]] + child_line
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                self.cutoffs += 1
+                self.first_move_cutoffs += int(index == 0)
+                if self.move_ordering is not None:
+                    self.move_ordering.record_cutoff(action.get_move()[0], depth, ply)
+                if self.on_cutoff is not None:
+                    self.on_cutoff(action, depth, ply)
+                break
+
+        if board_hash is not None:
+            flag = EXACT
+            if best_score <= original_alpha:
+                flag = UPPERBOUND
+            elif best_score >= beta:
+                flag = LOWERBOUND
+            # The move is stored in the canonical frame, every transform is its own inverse.
+            rows, cols = state.get_rep().get_dimensions()
+            tt_move = get_symmetry_tables(rows, cols).transform_position(best_action.get_move()[0], transform)
+            self.transposition_table[board_hash] = (depth, best_score, flag, tt_move)
+        return best_score, best_action
+
+    @staticmethod
+    def _tt_action(state: GameStateHex, tt_move: tuple[int, int] | None, transform: int) -> Action | None:
+        if tt_move is None:
+            return None
+        rows, cols = state.get_rep().get_dimensions()
+        position = get_symmetry_tables(rows, cols).transform_position(tt_move, transform)
+        return LazyStatefulAction(state, position, state.get_active_player().get_piece_type())
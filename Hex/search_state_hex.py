@@ -0,0 +1,250 @@
+from __future__ import annotations
+from typing import Generator
+
+import numpy as np
+
+from board_hex import GRID_CODES, BoardHex, get_shared_piece
+from empty_cells_hex import EmptyCells
+from game_state_hex import GameStateHex
+from geometry_hex import get_geometry
+from player_hex import PlayerHex
+from union_find_hex import WINNING_FLAGS, get_side_flags
+from zobrist_hex import get_zobrist_table
+
+
+class SearchStateHex:
+    """
+    A mutable Hex position for depth-first search.
+
+    Moves are made and unmade in place with `play` and `undo` on a single
+    flat board, so walking the tree copies no board per node. Stone groups
+    are kept in a union-find with union by size and no path compression, so
+    every merge can be rolled back and `winner` stays near-constant time.
+
+    Use `from_game_state` at the root of a search and `to_game_state` to get
+    back to the seahorse API.
+
+    Attributes:
+        dimensions (tuple[int, int]): the dimensions of the board
+        cells (list[str | None]): piece type of every cell, indexed by i*cols+j
+        empty (EmptyCells): indexed set of the empty cells
+        grid (np.ndarray): int8 (rows, cols) view of the cells, 0 empty, 1 "R" and 2 "B"
+        masks (dict[str, int]): bitmask of the stones of each piece type, bit i*cols+j for cell (i,j)
+        to_move (str): piece type of the player to move
+        players (list[PlayerHex]): the players of the game, in playing order
+        step (int): number of moves played since the start of the game
+        zobrist (int): Zobrist key of the board, updated by every move
+    """
+
+    def __init__(self, rows: int, cols: int, to_move: str = "R",
+                 players: list[PlayerHex] | None = None, step: int = 0) -> None:
+        self.dimensions = (rows, cols)
+        self.geometry = get_geometry(rows, cols)
+        self.side_flags = get_side_flags(rows, cols)
+        self.zobrist_table = get_zobrist_table(rows, cols)
+        self.zobrist = 0
+        self.cells: list[str | None] = [None] * (rows * cols)
+        self.empty = EmptyCells(self.cells)
+        self.grid = np.zeros((rows, cols), dtype=np.int8)
+        self._flat_grid = self.grid.reshape(-1)
+        self.masks = {"R": 0, "B": 0}
+        self.parent = list(range(rows * cols))
+        self.size = [1] * (rows * cols)
+        self.flags = list(self.side_flags)
+        self.to_move = to_move
+        self.players = players
+        self.step = step
+        # One entry per move played: (cell index, merges, winner before the move)
+        self.history: list[tuple[int, list[tuple[int, int, int]], str | None]] = []
+        self._winner: str | None = None
+
+    @classmethod
+    def from_game_state(cls, state: GameStateHex) -> SearchStateHex:
+        """
+        Builds a search state holding the position of a seahorse game state.
+
+        Args:
+            state (GameStateHex): the game state
+
+        Returns:
+            SearchStateHex: the search state, with the active player to move
+        """
+        rows, cols = state.get_rep().get_dimensions()
+        return cls.from_cells(rows, cols, state.get_rep().get_cells(), state.get_active_player().get_piece_type(),
+                              players=state.get_players(), step=state.get_step())
+
+    @classmethod
+    def from_cells(cls, rows: int, cols: int, cells: list[str | None], to_move: str,
+                   players: list[PlayerHex] | None = None, step: int = 0) -> SearchStateHex:
+        """
+        Builds a search state from a flat cell list, e.g. in a worker process
+        that only received the plain position.
+
+        Args:
+            rows (int): number of lines of the board
+            cols (int): number of columns of the board
+            cells (list[str | None]): piece type of every cell, indexed by i*cols+j
+            to_move (str): piece type of the player to move
+            players (list[PlayerHex] | None): the players of the game, in playing order
+            step (int): number of moves played since the start of the game
+
+        Returns:
+            SearchStateHex: the search state
+        """
+        search = cls(rows, cols, to_move, players=players, step=step)
+        for index, piece_type in enumerate(cells):
+            if piece_type is not None:
+                search._place(index, piece_type)
+        return search
+
+    def to_game_state(self) -> GameStateHex:
+        """
+        Builds the seahorse game state of the current position.
+
+        Returns:
+            GameStateHex: the game state
+        """
+        if self.players is None:
+            raise ValueError("The search state has no players to build a game state with.")
+        owners = {player.get_piece_type(): player for player in self.players}
+        pieces = {t: get_shared_piece(t, owner.get_id()) for t, owner in owners.items()}
+        coords = self.geometry.coords
+        env = {coords[index]: pieces[t] for index, t in enumerate(self.cells) if t is not None}
+        winner = self.winner()
+        scores = {player.get_id(): 1.0 if player.get_piece_type() == winner else 0
+                  for player in self.players}
+        last_move = None
+        if self.history:
+            index = self.history[-1][0]
+            last_move = (coords[index], self.cells[index])
+        return GameStateHex(scores, owners[self.to_move], self.players,
+                            BoardHex(env=env, dim=list(self.dimensions)), step=self.step,
+                            last_move=last_move)
+
+    def get_rep(self) -> SearchStateHex:
+        """
+        Returns the state itself, which also answers the board queries
+        (`get_dimensions`, `get_cells`) used by the heuristics.
+
+        Returns:
+            SearchStateHex: this state
+        """
+        return self
+
+    def get_dimensions(self) -> list[int]:
+        return list(self.dimensions)
+
+    def get_cells(self) -> list[str | None]:
+        """
+        Returns the live cell list of the board, it must not be modified.
+
+        Returns:
+            list[str | None]: "R", "B" or None for every cell
+        """
+        return self.cells
+
+    def get_grid_array(self) -> np.ndarray:
+        """
+        Returns the live int8 grid of the board, it must not be modified.
+
+        Returns:
+            np.ndarray: 0 for an empty cell, 1 for "R" and 2 for "B", of shape (rows, cols)
+        """
+        return self.grid
+
+    def get_empty(self) -> Generator[tuple[int, int], None, None]:
+        coords = self.geometry.coords
+        for index in self.get_empty_indices():
+            yield coords[index]
+
+    def get_empty_indices(self) -> list[int]:
+        """
+        Returns a snapshot of the indices of the empty cells, safe to iterate
+        while playing and undoing moves.
+
+        Returns:
+            list[int]: indices of the empty cells
+        """
+        return self.empty.cells.copy()
+
+    def get_empty_count(self) -> int:
+        return len(self.empty)
+
+    def find(self, index: int) -> int:
+        parent = self.parent
+        while parent[index] != index:
+            index = parent[index]
+        return index
+
+    def _place(self, index: int, piece_type: str) -> list[tuple[int, int, int]]:
+        """
+        Places a stone and merges its group, returning the merges to roll back.
+        """
+        cells, parent, size, flags = self.cells, self.parent, self.size, self.flags
+        cells[index] = piece_type
+        self.empty.remove(index)
+        self._flat_grid[index] = GRID_CODES[piece_type]
+        self.masks[piece_type] |= 1 << index
+        self.zobrist ^= self.zobrist_table[piece_type][index]
+        merges = []
+        root = index
+        for n in self.geometry.neighbours[index]:
+            if cells[n] == piece_type:
+                other = self.find(n)
+                if other != root:
+                    if size[other] > size[root]:
+                        root, other = other, root
+                    merges.append((other, root, flags[root]))
+                    parent[other] = root
+                    size[root] += size[other]
+                    flags[root] |= flags[other]
+        wanted = WINNING_FLAGS[piece_type]
+        if self._winner is None and flags[root] & wanted == wanted:
+            self._winner = piece_type
+        return merges
+
+    def play(self, position: tuple[int, int] | int) -> None:
+        """
+        Places a stone of the player to move and hands the turn over.
+
+        Args:
+            position (tuple[int, int] | int): coordinates or index of an empty cell
+        """
+        index = position if isinstance(position, int) else position[0] * self.dimensions[1] + position[1]
+        winner = self._winner
+        self.history.append((index, self._place(index, self.to_move), winner))
+        self.to_move = "B" if self.to_move == "R" else "R"
+        self.step += 1
+
+    def undo(self) -> int:
+        """
+        Takes back the last move played.
+
+        Returns:
+            int: index of the cell that was freed
+        """
+        index, merges, winner = self.history.pop()
+        parent, size, flags = self.parent, self.size, self.flags
+        for other, root, root_flags in reversed(merges):
+            parent[other] = other
+            size[root] -= size[other]
+            flags[root] = root_flags
+        piece_type = self.cells[index]
+        self.zobrist ^= self.zobrist_table[piece_type][index]
+        self.masks[piece_type] ^= 1 << index
+        self.cells[index] = None
+        self.empty.add(index)
+        self._flat_grid[index] = 0
+        self._winner = winner
+        self.to_move = "B" if self.to_move == "R" else "R"
+        self.step -= 1
+        return index
+
+    def winner(self) -> str | None:
+        """
+        Returns the piece type of the player who connected its sides.
+
+        Returns:
+            str | None: "R", "B" or None if the game is not over
+        """
+        return self._winner
@@ -0,0 +1,180 @@
+from __future__ import annotations
+import atexit
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from seahorse.game.action import Action
+
+from game_state_hex import GameStateHex
+from stateful_action_hex import LazyStatefulAction
+from transposition_hex import TranspositionTable
+
+# Extra seconds waited for the helpers after the deadline, to collect the
+# result of an iteration they were finishing.
+COLLECT_GRACE = 0.1
+
+
+# Player of a LazySMP helper process, the spec it was built from and the
+# shared table it searches with, kept between moves.
+_helper_player = None
+_helper_spec: tuple | None = None
+_helper_table: TranspositionTable | None = None
+
+
+def _helper_search(spec: tuple, table_spec: tuple[float, int, str, int], state: dict, time_limit: float,
+                   start_depth: int, max_depth: int) -> tuple[int, tuple[int, int] | None, float | None, int]:
+    global _helper_player, _helper_spec, _helper_table
+    player_cls, piece_type, player_id, player_kwargs = spec
+    size_mb, cols, name, generation = table_spec
+    state = GameStateHex.from_json(state)
+    if _helper_table is None or _helper_table.name != name:
+        if _helper_table is not None:
+            _helper_table.close()
+        _helper_table = TranspositionTable(size_mb, cols, name=name)
+        _helper_player = None
+    if _helper_player is None or _helper_spec != spec:
+        _helper_player, _helper_spec = player_cls(piece_type, **player_kwargs), spec
+        _helper_player.id = player_id
+        _helper_player.init_search(*state.get_rep().get_dimensions(), _helper_table)
+    # Same generation as the main search, which ages the table the same way
+    _helper_table.generation = generation
+    search = _helper_player.search
+    action, score = search.iterative_deepening(state, time_limit, max_depth, start_depth)
+    position = None if action is None else action.get_move()[0]
+    return search.completed_depth, position, score, search.nodes
+
+
+def is_last_move(state: GameStateHex) -> bool:
+    """
+    Tells whether a game is over, or can be won by the player to move with
+    one stone: the position after a move of the player is then the last one
+    the player may see.
+
+    Args:
+        state (GameStateHex): the position after a move of the player
+
+    Returns:
+        bool: True if the game is over or the opponent has a winning move
+    """
+    if state.is_done():
+        return True
+    groups = state.get_groups()
+    piece_type = state.get_active_player().get_piece_type()
+    return any(groups.wins_with_stone(position, piece_type) for position in state.get_rep().get_empty())
+
+
+class LazySMP:
+    """
+    Lazy SMP: the main process and several helper processes run the same
+    iterative deepening search of the root, sharing only a transposition
+    table in shared memory, so every search feeds the others with cutoffs
+    and best moves.
+
+    The transposition table of the player's PVSearch must be a shared
+    TranspositionTable. Every helper builds its own player once, from the
+    class, piece type and id of the player and `player_kwargs`, and sets its
+    search up with the player's `init_search(rows, cols, transposition_table)`
+    over the shared table. Each move, the helpers only receive the JSON of
+    the position, the name and generation of the table and the deadline,
+    never the player. Helpers start at staggered depths, odd ones
+    one ply deeper, so that they do not all search the same tree in the same
+    order. When the deadline is over, the result of the deepest completed
+    iteration among all the searches is played.
+
+    The players of `-t local` also get the helpers: ContaineredPlayerProxy
+    starts each of them in a process spawned by aiomultiprocess, which is
+    the main process of its own interpreter and not a daemon. `can_fork`
+    still checks the daemon flag as a safeguard, since a daemon process may
+    not have children: the search then runs in the calling process only.
+
+    The proxy terminates the player process at the end of the game, so its
+    atexit handlers never run. The player must `close` the helpers and its
+    shared table itself once `is_last_move` tells that the game may end.
+
+    Attributes:
+        helpers (int): number of helper processes, 0 to search alone
+        player_kwargs (dict): constructor arguments of the helper players, besides the piece type
+        executor (ProcessPoolExecutor | None): the helper pool, None until the first search
+        parallel (bool): whether the last search used the helpers
+        completed_depth (int): deepest iteration completed by the last search
+        nodes (int): nodes visited by the last search, over all processes
+    """
+
+    def __init__(self, helpers: int, player_kwargs: dict | None = None) -> None:
+        self.helpers = helpers
+        self.player_kwargs = {} if player_kwargs is None else player_kwargs
+        self.executor: ProcessPoolExecutor | None = None
+        self.parallel = False
+        self.completed_depth = 0
+        self.nodes = 0
+
+    def can_fork(self) -> bool:
+        """
+        Tells whether the calling process may start the helper pool.
+
+        Returns:
+            bool: False in a daemon process or without helpers
+        """
+        return self.helpers > 0 and not multiprocessing.current_process().daemon
+
+    def search(self, player, state: GameStateHex, time_limit: float,
+               max_depth: int = 9) -> tuple[Action | None, float | None]:
+        """
+        Searches a position with the player's PVSearch in every process.
+
+        Args:
+            player: the player, whose `search` attribute is a PVSearch over a shared TranspositionTable,
+                and whose `init_search` sets up the search of a helper
+            state (GameStateHex): the position, the player is its active player
+            time_limit (float): deadline, in seconds since the epoch as given by time.time()
+            max_depth (int): deepest iteration
+
+        Returns:
+            tuple[Action | None, float | None]: best move and score of the deepest completed iteration,
+                (None, None) if none completed
+        """
+        table = player.search.transposition_table
+        if not isinstance(table, TranspositionTable) or table.name is None:
+            raise ValueError("Lazy SMP needs the search to use a shared TranspositionTable.")
+        futures = []
+        self.parallel = self.can_fork()
+        if self.parallel:
+            try:
+                if self.executor is None:
+                    self.executor = ProcessPoolExecutor(self.helpers)
+                    atexit.register(self.close)
+                spec = (type(player), player.get_piece_type(), player.get_id(), self.player_kwargs)
+                table_spec = (table.size_mb, table.cols, table.name, table.generation)
+                data = state.to_json()
+                futures = [self.executor.submit(_helper_search, spec, table_spec, data, time_limit,
+                                                1 + helper % 2, max_depth)
+                           for helper in range(1, self.helpers + 1)]
+            except BrokenProcessPool:
+                self.close()
+                self.parallel = False
+
+        action, score = player.search.iterative_deepening(state, time_limit, max_depth)
+        self.completed_depth, self.nodes = player.search.completed_depth, player.search.nodes
+
+        done, _ = wait(futures, timeout=max(0.0, time_limit + COLLECT_GRACE - time.time()))
+        for future in done:
+            try:
+                depth, position, helper_score, nodes = future.result()
+            except BrokenProcessPool:
+                self.close()
+                break
+            self.nodes += nodes
+            if position is not None and depth > self.completed_depth:
+                self.completed_depth, score = depth, helper_score
+                action = LazyStatefulAction(state, position, state.get_active_player().get_piece_type())
+        return action, score
+
+    def close(self) -> None:
+        """
+        Shuts the helper pool down, without waiting for running searches.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
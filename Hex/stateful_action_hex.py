@@ -0,0 +1,47 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+from seahorse.game.stateful_action import StatefulAction
+
+if TYPE_CHECKING:
+    from game_state_hex import GameStateHex
+
+
+class LazyStatefulAction(StatefulAction):
+    """
+    A stateful action that only records the move, and builds the next game
+    state the first time it is accessed.
+
+    Hashing, equality and serialization go through the next game state, so
+    the action stays interchangeable with a plain StatefulAction.
+
+    Attributes:
+        current_game_state (GameStateHex): the state the move is played from
+        position (tuple[int, int]): the cell where the piece is placed
+        piece_type (str): the type of the placed piece
+    """
+
+    def __init__(self, current_game_state: GameStateHex, position: tuple[int, int], piece_type: str) -> None:
+        self.current_game_state = current_game_state
+        self.position = position
+        self.piece_type = piece_type
+        self._next_game_state = None
+
+    def get_move(self) -> tuple[tuple[int, int], str]:
+        """
+        Returns the move of the action without building the next game state.
+
+        Returns:
+            tuple[tuple[int, int], str]: the position and piece type of the move
+        """
+        return self.position, self.piece_type
+
+    @property
+    def next_game_state(self) -> GameStateHex:
+        if self._next_game_state is None:
+            self._next_game_state = self.current_game_state._next_state(self.position, self.piece_type)
+        return self._next_game_state
+
+    @next_game_state.setter
+    def next_game_state(self, next_game_state: GameStateHex) -> None:
+        self._next_game_state = next_game_state
@@ -0,0 +1,213 @@
+from __future__ import annotations
+import random
+from functools import lru_cache
+
+from zobrist_hex import ZOBRIST_SEED, get_zobrist_table
+
+# Transforms of an Hex position onto an equivalent one. The last two swap the
+# colours and the player to move, and only exist on square boards.
+IDENTITY, ROTATION, SWAP, ROTATION_SWAP = 0, 1, 2, 3
+
+OTHER_PIECE = {"R": "B", "B": "R"}
+
+
+class SymmetryTables:
+    """
+    Permutation and key tables of the symmetries of an Hex board, built once
+    per board size.
+
+    ROTATION turns the board by 180 degrees, (i,j) -> (rows-1-i, cols-1-j).
+    SWAP transposes it, (i,j) -> (j,i), and swaps the colours and the player
+    to move, which maps a position onto the same position seen by the other
+    player. ROTATION_SWAP chains both. Every transform is its own inverse.
+
+    Attributes:
+        rows (int): number of lines of the board
+        cols (int): number of columns of the board
+        transforms (tuple[int, ...]): transforms available on this board size
+        permutations (dict[int, tuple[int, ...]]): destination index of every cell, per transform
+        keys (dict[int, dict[str, tuple[int, ...]]]): Zobrist key a stone on each cell gets once transformed, per transform and piece type
+        side_key (int): Zobrist key of "B" to move
+    """
+
+    def __init__(self, rows: int, cols: int) -> None:
+        self.rows = rows
+        self.cols = cols
+        size = rows * cols
+        self.transforms = (IDENTITY, ROTATION, SWAP, ROTATION_SWAP) if rows == cols else (IDENTITY, ROTATION)
+        rotation = tuple(size - 1 - index for index in range(size))
+        swap = tuple((index % cols) * cols + index // cols for index in range(size))
+        self.permutations = {IDENTITY: tuple(range(size)), ROTATION: rotation}
+        if rows == cols:
+            self.permutations[SWAP] = swap
+            self.permutations[ROTATION_SWAP] = tuple(rotation[n] for n in swap)
+
+        table = get_zobrist_table(rows, cols)
+        self.keys = {}
+        for transform, permutation in self.permutations.items():
+            self.keys[transform] = {
+                piece_type: tuple(table[self.transform_piece(piece_type, transform)][n] for n in permutation)
+                for piece_type in ("R", "B")}
+        self.side_key = random.Random(ZOBRIST_SEED ^ (size << 8) ^ 0x5D).getrandbits(64)
+
+    @staticmethod
+    def swaps_colours(transform: int) -> bool:
+        """
+        Tells whether a transform swaps the colours and the player to move.
+
+        Args:
+            transform (int): the transform
+
+        Returns:
+            bool: True for SWAP and ROTATION_SWAP
+        """
+        return transform >= SWAP
+
+    @classmethod
+    def transform_piece(cls, piece_type: str, transform: int) -> str:
+        """
+        Returns the piece type a stone or player becomes under a transform.
+
+        Args:
+            piece_type (str): "R" or "B"
+            transform (int): the transform
+
+        Returns:
+            str: "R" or "B"
+        """
+        return OTHER_PIECE[piece_type] if cls.swaps_colours(transform) else piece_type
+
+    def transform_position(self, position: tuple[int, int], transform: int) -> tuple[int, int]:
+        """
+        Maps the coordinates of a cell, or of a move, through a transform.
+        Applying the same transform again maps them back.
+
+        Args:
+            position (tuple[int, int]): coordinates of the cell
+            transform (int): the transform
+
+        Returns:
+            tuple[int, int]: coordinates of the transformed cell
+        """
+        index = self.permutations[transform][position[0] * self.cols + position[1]]
+        return (index // self.cols, index % self.cols)
+
+    def get_keys(self, cells: list[str | None], to_move: str,
+                 transforms: tuple[int, ...] | None = None) -> dict[int, int]:
+        """
+        Computes from scratch the Zobrist key of transforms of a position.
+
+        The IDENTITY key with "R" to move is the key of `compute_zobrist`.
+
+        Args:
+            cells (list[str | None]): piece type of every cell, indexed by i*cols+j
+            to_move (str): piece type of the player to move
+            transforms (tuple[int, ...] | None): transforms to compute, all the transforms of the board by default
+
+        Returns:
+            dict[int, int]: key of the transformed position, per transform
+        """
+        keys = {}
+        for transform in self.transforms if transforms is None else transforms:
+            tables = self.keys[transform]
+            key = self.side_key if self.transform_piece(to_move, transform) == "B" else 0
+            for index, piece_type in enumerate(cells):
+                if piece_type is not None:
+                    key ^= tables[piece_type][index]
+            keys[transform] = key
+        return keys
+
+    def get_canonical_key(self, cells: list[str | None], to_move: str,
+                          colour_swaps: bool = True) -> tuple[int, int]:
+        """
+        Returns the smallest key among the transforms of a position, so that
+        every equivalent position gets the same key.
+
+        Positions reached in a game never have a colour-swapped equivalent
+        with the right player to move, so caches of a single game tree can
+        restrict themselves to the colour-preserving transforms.
+
+        Args:
+            cells (list[str | None]): piece type of every cell, indexed by i*cols+j
+            to_move (str): piece type of the player to move
+            colour_swaps (bool): whether SWAP and ROTATION_SWAP are considered
+
+        Returns:
+            tuple[int, int]: the canonical key and the transform that maps the position onto it
+        """
+        transforms = self.transforms if colour_swaps else (IDENTITY, ROTATION)
+        keys = self.get_keys(cells, to_move, transforms)
+        transform = min(transforms, key=lambda t: (keys[t], t))
+        return keys[transform], transform
+
+    def get_stabilizer(self, cells: list[str | None]) -> tuple[int, ...]:
+        """
+        Returns the colour-preserving transforms that leave a position unchanged.
+
+        Args:
+            cells (list[str | None]): piece type of every cell, indexed by i*cols+j
+
+        Returns:
+            tuple[int, ...]: IDENTITY, and ROTATION if the position is symmetric
+        """
+        rotation = self.permutations[ROTATION]
+        if all(cells[rotation[index]] == piece_type for index, piece_type in enumerate(cells)):
+            return (IDENTITY, ROTATION)
+        return (IDENTITY,)
+
+    def get_unique_moves(self, cells: list[str | None]) -> list[int]:
+        """
+        Returns the empty cells of a position, keeping one cell of every set
+        of cells that the symmetries of the position map onto each other.
+
+        Args:
+            cells (list[str | None]): piece type of every cell, indexed by i*cols+j
+
+        Returns:
+            list[int]: indices of the non-equivalent empty cells, in increasing order
+        """
+        permutations = [self.permutations[t] for t in self.get_stabilizer(cells)]
+        return [index for index, piece_type in enumerate(cells)
+                if piece_type is None and all(permutation[index] >= index for permutation in permutations)]
+
+
+@lru_cache(maxsize=None)
+def get_symmetry_tables(rows: int, cols: int) -> SymmetryTables:
+    """
+    Returns the symmetry tables of a board size, building them on first use.
+
+    Args:
+        rows (int): number of lines of the board
+        cols (int): number of columns of the board
+
+    Returns:
+        SymmetryTables: the cached tables
+    """
+    return SymmetryTables(rows, cols)
+
+
+def get_canonical_key(state, colour_swaps: bool = True) -> tuple[int, int]:
+    """
+    Returns the canonical key of a game state and the transform that maps the
+    state onto its canonical form.
+
+    The IDENTITY and ROTATION keys come from the keys the state carries from
+    move to move, only the colour-swapping keys are computed from the cells.
+
+    Args:
+        state (GameStateHex): the game state
+        colour_swaps (bool): whether SWAP and ROTATION_SWAP are considered
+
+    Returns:
+        tuple[int, int]: the canonical key and the transform
+    """
+    rows, cols = state.get_rep().get_dimensions()
+    tables = get_symmetry_tables(rows, cols)
+    to_move = state.get_active_player().get_piece_type()
+    # ROTATION keeps the colours, both keys share the side to move
+    side = tables.side_key if to_move == "B" else 0
+    keys = {IDENTITY: state.get_zobrist() ^ side, ROTATION: state.get_rotated_zobrist() ^ side}
+    if colour_swaps and len(tables.transforms) > 2:
+        keys.update(tables.get_keys(state.get_rep().get_cells(), to_move, (SWAP, ROTATION_SWAP)))
+    transform = min(keys, key=lambda t: (keys[t], t))
+    return keys[transform], transform
@@ -0,0 +1,213 @@
+from __future__ import annotations
+import threading
+import time
+
+# Seconds of the game clock never spent on searching, for the transfers of
+# the player proxy and the moves played in panic.
+RESERVE = 2.0
+
+# Below this much time left on the clock, the player answers with its
+# fallback move without searching.
+PANIC_TIME = 1.0
+
+# Each player plays at most half of the empty cells, and is assumed to have
+# at least this many moves left.
+MIN_MOVES_LEFT = 10
+
+# A new iteration costs about as much as all the previous ones together
+# times the branching factor: it only starts within this share of the budget.
+NEW_ITERATION_SHARE = 0.5
+
+
+class Watchdog:
+    """
+    Deadline flag raised by a timer thread.
+
+    A search reads `expired` at every node instead of the clock: the flag is
+    a plain attribute, and the timer thread sets it once, when the deadline
+    is over. `expire` raises it early, to stop a search from another thread.
+
+    Every `arm` starts a new generation: a timer of a previous generation
+    that fires late, while the flag is lowered for the next search, is
+    ignored instead of stopping that search.
+
+    Attributes:
+        expired (bool): whether the deadline is over or the search was stopped
+    """
+
+    def __init__(self) -> None:
+        self.expired = False
+        self._timer: threading.Timer | None = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        # Neither a timer nor a lock can be pickled, a search travels without them.
+        return {"expired": self.expired, "_generation": self._generation}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__()
+        self.expired, self._generation = state["expired"], state["_generation"]
+
+    def arm(self, deadline: float) -> None:
+        """
+        Lowers the flag and raises it again at a deadline.
+
+        Args:
+            deadline (float): seconds since the epoch as given by time.time(), infinite to never expire
+        """
+        self.cancel()
+        with self._lock:
+            self.expired = False
+            generation = self._generation
+        if deadline != float("inf"):
+            self._timer = threading.Timer(max(0.0, deadline - time.time()), self._expire_generation,
+                                          args=(generation,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def cancel(self) -> None:
+        """
+        Stops the timer, leaving the flag as it is. A timer already firing
+        belongs to a past generation and leaves the flag alone.
+        """
+        with self._lock:
+            self._generation += 1
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _expire_generation(self, generation: int) -> None:
+        # The lock orders the check against arm: a late timer sees the new generation.
+        with self._lock:
+            if generation == self._generation:
+                self.expired = True
+
+    def expire(self) -> None:
+        """
+        Raises the flag.
+        """
+        self.expired = True
+
+
+class TimeManager:
+    """
+    Time allocation of the moves of a game.
+
+    A move gets an equal share of the remaining time, minus a reserve, over
+    the moves left to play, estimated from the empty cells. That share is a
+    soft limit: iterative deepening stops starting new iterations once half
+    of it is spent, and interrupts the running iteration when it is over.
+    Every change of the best move between two iterations extends it by
+    `instability_weight` times its base, up to the hard limit: `max_stretch`
+    times the base, never more than `max_time` nor the clock minus the
+    reserve.
+
+    When the clock is nearly gone, `is_panic` tells the player to answer
+    with a move found without searching.
+
+    Attributes:
+        max_time (float): upper bound of the time of a move, hard limit included, in seconds
+        min_time (float): lower bound of the hard limit of a move, in seconds
+        instability_weight (float): share of the base budget added by every change of the best move
+        max_stretch (float): hard limit of a move, as a multiple of its base budget
+        start_time (float): time.time() at the start of the current move
+        base (float): budget of the current move before instability, in seconds
+        hard_limit (float): time the current move may never exceed, in seconds
+        changes (int): changes of the best move between the iterations of the current move
+        best_move (tuple[int, int] | None): best move of the last completed iteration
+    """
+
+    def __init__(self, max_time: float = 10.0, min_time: float = 0.05, instability_weight: float = 0.5,
+                 max_stretch: float = 3.0) -> None:
+        self.max_time = max_time
+        self.min_time = min_time
+        self.instability_weight = instability_weight
+        self.max_stretch = max_stretch
+        self.start_time = time.time()
+        self.base = self.hard_limit = 0.0
+        self.changes = 0
+        self.best_move: tuple[int, int] | None = None
+
+    def allocate(self, remaining_time: float, empty_count: int) -> float:
+        """
+        Splits the remaining time over the moves still to play.
+
+        Args:
+            remaining_time (float): time left for the whole game, in seconds
+            empty_count (int): number of empty cells
+
+        Returns:
+            float: base budget of the move, in seconds
+        """
+        moves_left = max(MIN_MOVES_LEFT, empty_count // 2)
+        return max(self.min_time, min(self.max_time, (remaining_time - RESERVE) / moves_left))
+
+    def start(self, remaining_time: float, empty_count: int) -> float:
+        """
+        Starts the clock of a move.
+
+        Args:
+            remaining_time (float): time left for the whole game, in seconds
+            empty_count (int): number of empty cells
+
+        Returns:
+            float: hard deadline of the move, in seconds since the epoch as given by time.time()
+        """
+        self.start_time = time.time()
+        self.base = self.allocate(remaining_time, empty_count)
+        self.hard_limit = max(self.min_time, min(self.base * self.max_stretch, self.max_time,
+                                                 remaining_time - RESERVE))
+        self.changes = 0
+        self.best_move = None
+        return self.start_time + self.hard_limit
+
+    def record_iteration(self, move: tuple[int, int]) -> None:
+        """
+        Records the best move of a completed iteration.
+
+        Args:
+            move (tuple[int, int]): the best move
+        """
+        if self.best_move is not None and move != self.best_move:
+            self.changes += 1
+        self.best_move = move
+
+    def get_soft_limit(self) -> float:
+        """
+        Returns the budget of the current move, extended by its instability.
+
+        Returns:
+            float: soft limit of the move, in seconds
+        """
+        return min(self.hard_limit, self.base * (1 + self.instability_weight * self.changes))
+
+    def get_deadline(self) -> float:
+        """
+        Returns the time the current move should end at.
+
+        Returns:
+            float: start of the move plus its soft limit, in seconds since the epoch
+        """
+        return self.start_time + self.get_soft_limit()
+
+    def should_deepen(self) -> bool:
+        """
+        Tells whether a new iteration may start.
+
+        Returns:
+            bool: False once half the soft limit of the move is spent
+        """
+        return time.time() - self.start_time < NEW_ITERATION_SHARE * self.get_soft_limit()
+
+    def is_panic(self, remaining_time: float) -> bool:
+        """
+        Tells whether the clock is too low to search.
+
+        Args:
+            remaining_time (float): time left for the whole game, in seconds
+
+        Returns:
+            bool: True if the player should play its fallback move at once
+        """
+        return remaining_time < PANIC_TIME
@@ -0,0 +1,226 @@
+from __future__ import annotations
+import atexit
+import struct
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Bound flags, in the order of their codes in the packed entries.
+FLAGS = ("EXACT", "LOWERBOUND", "UPPERBOUND")
+FLAG_CODES = {flag: code for code, flag in enumerate(FLAGS)}
+
+NO_MOVE = -1
+
+
+# Slots of a bucket: the first keeps the deepest search of the positions
+# hashed to the bucket, the second always takes the last store.
+DEPTH_SLOT, ALWAYS_SLOT = 0, 1
+
+# Bytes of an entry: check word and data word.
+ENTRY_BYTES = 16
+
+# Searches are numbered modulo GENERATIONS in the entries.
+GENERATIONS = 64
+
+
+class TranspositionTable:
+    """
+    Fixed-size transposition table preallocated in a NumPy array, that
+    several processes can share through `multiprocessing.shared_memory`.
+
+    It is a drop-in replacement of the dict of PVSearch: `get` and item
+    assignment take and return (depth, score, flag, move) tuples, the move
+    being the coordinates of a cell or None.
+
+    The table is a power of two of buckets of two entries. A store goes to
+    the depth-preferred slot when it holds the same position, is empty,
+    holds a shallower search or an entry of a previous search, and to the
+    always-replace slot otherwise, so deep results survive a flood of
+    shallow ones without blocking new ones. Entries of previous searches are
+    kept and still answer lookups until they get replaced: `new_search`
+    only ages them.
+
+    Every entry is two uint64 words, the packed data and the key xored with
+    the data. Writers never lock: a reader that gets the words of two
+    different writes sees a key that does not match and treats the entry as
+    missing. The packed data holds the score as a float32, the depth, the
+    flag, the generation of the search and the cell index of the move.
+
+    Attributes:
+        size_mb (float): requested size of the table, in MiB
+        buckets (int): number of buckets, the largest power of two that fits in size_mb
+        cols (int): number of columns of the board, to turn moves into cell indices
+        name (str | None): name of the shared memory block, None for a private table
+        table (np.ndarray): (buckets, 2, 2) uint64 array, check word and data word of every entry
+        probes (int): lookups since the last `reset_stats`, in this process
+        hits (int): lookups that found their position
+        stores (int): entries written
+        generation (int): number of the current search, modulo GENERATIONS
+    """
+
+    def __init__(self, size_mb: float, cols: int, shared: bool = False, name: str | None = None) -> None:
+        """
+        Builds an empty table, or attaches to the shared table of another process.
+
+        Args:
+            size_mb (float): size of the table, in MiB, rounded down to a power of two of buckets
+            cols (int): number of columns of the board
+            shared (bool): whether to create the table in a new shared memory block
+            name (str | None): name of the shared memory block of an existing table to attach to
+        """
+        buckets = int(size_mb * 2**20) // (2 * ENTRY_BYTES)
+        if buckets < 1:
+            raise ValueError("A transposition table needs room for at least one bucket.")
+        self.size_mb = size_mb
+        self.buckets = 1 << (buckets.bit_length() - 1)
+        self.cols = cols
+        self.mask = self.buckets - 1
+        self.probes = self.hits = self.stores = 0
+        self.generation = 0
+        self._shm: shared_memory.SharedMemory | None = None
+        self._owner = False
+        shape = (self.buckets, 2, 2)
+        if name is not None:
+            self._shm = shared_memory.SharedMemory(name=name)
+        elif shared:
+            self._shm = shared_memory.SharedMemory(create=True, size=self.buckets * 2 * ENTRY_BYTES)
+            self._owner = True
+            atexit.register(self.close)
+        if self._shm is None:
+            self.name = None
+            self.table = np.zeros(shape, dtype=np.uint64)
+        else:
+            self.name = self._shm.name
+            self.table = np.ndarray(shape, dtype=np.uint64, buffer=self._shm.buf)
+            if self._owner:
+                self.table[:] = 0
+
+    def __getstate__(self) -> dict:
+        # A shared table travels by the name of its block.
+        state = {"size_mb": self.size_mb, "cols": self.cols, "name": self.name, "generation": self.generation}
+        if self.name is None:
+            state["table"] = self.table
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["size_mb"], state["cols"], name=state["name"])
+        self.generation = state["generation"]
+        if state["name"] is None:
+            self.table[:] = state["table"]
+
+    @staticmethod
+    def pack(depth: int, score: float, flag: str, move: int, generation: int = 0) -> int:
+        """
+        Packs the data of an entry in 64 bits.
+
+        Args:
+            depth (int): remaining depth of the search, from -128 to 127
+            score (float): the score, stored as a float32
+            flag (str): "EXACT", "LOWERBOUND" or "UPPERBOUND"
+            move (int): cell index of the best move, NO_MOVE if none
+            generation (int): number of the search, modulo GENERATIONS
+
+        Returns:
+            int: the packed data
+        """
+        score_bits = struct.unpack("<I", struct.pack("<f", score))[0]
+        return (score_bits | (depth + 128) << 32 | FLAG_CODES[flag] << 40 | generation << 42
+                | (move + 1) << 48)
+
+    @staticmethod
+    def unpack(data: int) -> tuple[int, float, str, int]:
+        """
+        Unpacks the data of an entry.
+
+        Args:
+            data (int): the packed data
+
+        Returns:
+            tuple[int, float, str, int]: depth, score, flag and cell index of the move
+        """
+        score = struct.unpack("<f", struct.pack("<I", data & 0xFFFFFFFF))[0]
+        return (data >> 32 & 0xFF) - 128, score, FLAGS[data >> 40 & 3], (data >> 48) - 1
+
+    def get(self, key: int, default=None):
+        """
+        Looks a position up.
+
+        Args:
+            key (int): 64-bit Zobrist key of the position
+            default: value returned on a miss
+
+        Returns:
+            tuple[int, float, str, tuple[int, int] | None] | None: depth, score, flag and move of the
+                entry, or default
+        """
+        self.probes += 1
+        for check, data in self.table[key & self.mask].tolist():
+            if data and check ^ data == key:
+                self.hits += 1
+                depth, score, flag, move = self.unpack(data)
+                return depth, score, flag, None if move == NO_MOVE else divmod(move, self.cols)
+        return default
+
+    def __setitem__(self, key: int, value: tuple) -> None:
+        depth, score, flag, move = value
+        data = self.pack(depth, score, flag, NO_MOVE if move is None else move[0] * self.cols + move[1],
+                         self.generation)
+        bucket = self.table[key & self.mask]
+        check, stored = bucket[DEPTH_SLOT].tolist()
+        if (not stored or check ^ stored == key or stored >> 42 & (GENERATIONS - 1) != self.generation
+                or (stored >> 32 & 0xFF) - 128 <= depth):
+            bucket[DEPTH_SLOT] = (key ^ data, data)
+        else:
+            bucket[ALWAYS_SLOT] = (key ^ data, data)
+        self.stores += 1
+
+    def new_search(self) -> None:
+        """
+        Starts a new generation: the entries stored so far stay readable, but
+        lose their claim on the depth-preferred slots.
+        """
+        self.generation = (self.generation + 1) % GENERATIONS
+
+    def get_hit_rate(self) -> float:
+        """
+        Returns the share of the lookups that found their position.
+
+        Returns:
+            float: hits / probes, 0 before the first lookup
+        """
+        return self.hits / self.probes if self.probes else 0.0
+
+    def get_occupancy(self) -> float:
+        """
+        Returns the share of the entries in use.
+
+        Returns:
+            float: used entries / entries
+        """
+        return float(np.count_nonzero(self.table[:, :, 1])) / (2 * self.buckets)
+
+    def reset_stats(self) -> None:
+        """
+        Sets the probe, hit and store counters back to zero.
+        """
+        self.probes = self.hits = self.stores = 0
+
+    def clear(self) -> None:
+        """
+        Empties the table.
+        """
+        self.table[:] = 0
+
+    def close(self) -> None:
+        """
+        Detaches the table from its shared memory block, and destroys the
+        block if this table created it. Only the creator destroys the block,
+        processes attached to it just detach.
+        """
+        if self._shm is None:
+            return
+        self.table = np.zeros((0, 2, 2), dtype=np.uint64)
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+        self._shm = None
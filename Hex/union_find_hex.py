@@ -0,0 +1,174 @@
+from __future__ import annotations
+from functools import lru_cache
+
+from geometry_hex import get_geometry
+
+TOP, BOTTOM, LEFT, RIGHT = 1, 2, 4, 8
+
+# Sides a group must touch to win, per piece type.
+WINNING_FLAGS = {"R": TOP | BOTTOM, "B": LEFT | RIGHT}
+
+
+@lru_cache(maxsize=None)
+def get_side_flags(rows: int, cols: int) -> tuple[int, ...]:
+    """
+    Builds, once per board size, the sides touched by every cell.
+
+    Args:
+        rows (int): number of lines of the board
+        cols (int): number of columns of the board
+
+    Returns:
+        tuple[int, ...]: TOP/BOTTOM/LEFT/RIGHT flags of every cell, indexed by cell index
+    """
+    return tuple((TOP if i == 0 else 0) | (BOTTOM if i == rows - 1 else 0)
+                 | (LEFT if j == 0 else 0) | (RIGHT if j == cols - 1 else 0)
+                 for i, j in get_geometry(rows, cols).coords)
+
+
+class HexUnionFind:
+    """
+    Disjoint-set structure of the stone groups of an Hex board.
+
+    Each group root carries the sides (TOP, BOTTOM, LEFT, RIGHT) its stones
+    touch, so adding a stone merges it with its friendly neighbours and tells
+    in near-constant time whether its group now connects the player's sides.
+
+    Attributes:
+        dimensions (tuple[int, int]): the dimensions of the board
+        cells (list[str | None]): piece type of every cell
+        parent (list[int]): parent of every cell in its group tree
+        flags (list[int]): sides touched by the group, valid on the roots
+    """
+
+    __slots__ = ("dimensions", "cells", "parent", "flags")
+
+    def __init__(self, rows: int, cols: int) -> None:
+        self.dimensions = (rows, cols)
+        self.cells: list[str | None] = [None] * (rows * cols)
+        self.parent = list(range(rows * cols))
+        self.flags = [0] * (rows * cols)
+
+    @classmethod
+    def from_board(cls, board) -> HexUnionFind:
+        """
+        Builds the groups of the pieces already on a board.
+
+        Args:
+            board (BoardHex): the board
+
+        Returns:
+            HexUnionFind: the groups of the board
+        """
+        groups = cls(*board.get_dimensions())
+        for index, piece_type in enumerate(board.get_cells()):
+            if piece_type is not None:
+                groups.add(index, piece_type)
+        return groups
+
+    def copy(self) -> HexUnionFind:
+        """
+        Returns an independent copy of the groups.
+
+        Returns:
+            HexUnionFind: the copy
+        """
+        groups = HexUnionFind.__new__(HexUnionFind)
+        groups.dimensions = self.dimensions
+        groups.cells = self.cells.copy()
+        groups.parent = self.parent.copy()
+        groups.flags = self.flags.copy()
+        return groups
+
+    def find(self, index: int) -> int:
+        """
+        Returns the root of the group of a cell, halving the path on the way.
+
+        Args:
+            index (int): index of the cell
+
+        Returns:
+            int: index of the root of the group
+        """
+        parent = self.parent
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    def add(self, index: int, piece_type: str) -> int:
+        """
+        Places a stone in place and merges it with its friendly neighbours.
+
+        Args:
+            index (int): index of the empty cell receiving the stone
+            piece_type (str): "R" or "B"
+
+        Returns:
+            int: the sides touched by the group of the new stone
+        """
+        rows, cols = self.dimensions
+        cells, parent = self.cells, self.parent
+        cells[index] = piece_type
+        flags = get_side_flags(rows, cols)[index]
+        for n in get_geometry(rows, cols).neighbours[index]:
+            if cells[n] == piece_type:
+                root = self.find(n)
+                if root != index:
+                    parent[root] = index
+                    flags |= self.flags[root]
+        self.flags[index] = flags
+        return flags
+
+    def with_stone(self, position: tuple[int, int], piece_type: str) -> HexUnionFind:
+        """
+        Returns a copy of the groups with an extra stone.
+
+        Args:
+            position (tuple[int, int]): coordinates of the new stone
+            piece_type (str): "R" or "B"
+
+        Returns:
+            HexUnionFind: the new groups, these groups are left unchanged
+        """
+        groups = self.copy()
+        groups.add(position[0] * self.dimensions[1] + position[1], piece_type)
+        return groups
+
+    def wins_with_stone(self, position: tuple[int, int], piece_type: str) -> bool:
+        """
+        Checks whether an extra stone would make its group connect the sides of
+        its colour, without copying the groups.
+
+        Args:
+            position (tuple[int, int]): coordinates of the empty cell
+            piece_type (str): "R" or "B"
+
+        Returns:
+            bool: True if the stone would win
+        """
+        rows, cols = self.dimensions
+        index = position[0] * cols + position[1]
+        flags = get_side_flags(rows, cols)[index]
+        for n in get_geometry(rows, cols).neighbours[index]:
+            if self.cells[n] == piece_type:
+                flags |= self.flags[self.find(n)]
+        wanted = WINNING_FLAGS[piece_type]
+        return flags & wanted == wanted
+
+    def is_winning(self, position: tuple[int, int]) -> bool:
+        """
+        Checks whether the group holding a stone connects the sides of its colour.
+
+        Args:
+            position (tuple[int, int]): coordinates of the stone
+
+        Returns:
+            bool: True if the group is winning
+        """
+        index = position[0] * self.dimensions[1] + position[1]
+        piece_type = self.cells[index]
+        if piece_type is None:
+            return False
+        wanted = WINNING_FLAGS[piece_type]
+        return self.flags[self.find(index)] & wanted == wanted
@@ -0,0 +1,45 @@
+from __future__ import annotations
+import random
+from functools import lru_cache
+
+ZOBRIST_SEED = 0x4E58
+
+
+@lru_cache(maxsize=None)
+def get_zobrist_table(rows: int, cols: int) -> dict[str, tuple[int, ...]]:
+    """
+    Builds, once per board size, the random 64-bit keys of every (piece type, cell).
+
+    The generator is seeded with the board size, so every process and every
+    player gets the same keys and the same hash for the same position.
+
+    Args:
+        rows (int): number of lines of the board
+        cols (int): number of columns of the board
+
+    Returns:
+        dict[str, tuple[int, ...]]: keys of the "R" and "B" pieces, indexed by cell index
+    """
+    rng = random.Random(ZOBRIST_SEED ^ (rows << 16) ^ cols)
+    return {piece_type: tuple(rng.getrandbits(64) for _ in range(rows * cols))
+            for piece_type in ("R", "B")}
+
+
+def compute_zobrist(cells: list[str | None], rows: int, cols: int) -> int:
+    """
+    Computes from scratch the Zobrist key of a position.
+
+    Args:
+        cells (list[str | None]): piece type of every cell, indexed by i*cols+j
+        rows (int): number of lines of the board
+        cols (int): number of columns of the board
+
+    Returns:
+        int: the 64-bit key of the position
+    """
+    table = get_zobrist_table(rows, cols)
+    key = 0
+    for index, piece_type in enumerate(cells):
+        if piece_type is not None:
+            key ^= table[piece_type][index]
+    return key